@@ -1,12 +1,60 @@
+import os
+import hashlib
+import multiprocessing
 from pathlib import Path
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+import click
 import numpy as np
 import polars as pl
 
 from lsl_comp.utils.pylogger import logger_creator
+from lsl_comp.utils.histogram import (
+    histogram_percentiles,
+    latency_histogram,
+    merge_histograms,
+)
+from lsl_comp.utils.logwriter import LOG_FORMATS
+from lsl_comp.utils.runstats import read_run_stats, stats_file_name
+from lsl_comp.utils.spectrum import welch_psd
+from lsl_comp.utils.regression import huber_fit, robust_scale
+from lsl_comp.telemetry import telemetry_file_name
 
 logger = logger_creator(verbose=True)
 
+# bump whenever a metric changes so cached results are recomputed
+ANALYSIS_VERSION = 8
+CACHE_FILE_NAME = "analysis_cache.parquet"
+RESULTS_FILE_NAME = "analysis.parquet"
+
+# runs that only differ in these columns are repetitions of the same combo
+COMBO_COLUMNS = [
+    "inlet",
+    "outlet",
+    "datatype",
+    "platform",
+    "multiproc",
+    "fs",
+    "window_size",
+    "chunk",
+    "channels",
+    "clocksync",
+]
+XLET_ROLES = ["outlet", "inlet"]
+# offset steps larger than this (s), and than JUMP_SCALES robust standard
+# deviations of all steps, count as clock sync jumps
+CLOCK_JUMP_MIN = 1e-3
+JUMP_SCALES = 5
+# consecutive samples arriving closer than this (s) belong to one burst
+BURST_INTERVAL = 20e-6
+LATENCY_PERCENTILES = {
+    "latency_p50": 50,
+    "latency_p90": 90,
+    "latency_p99": 99,
+    "latency_p999": 99.9,
+}
+
 
 # ====== helper functions =================
 def assign_xlet_filename(log_files: list[Path]) -> tuple[Path, Path]:
@@ -23,83 +71,129 @@ def assign_xlet_filename(log_files: list[Path]) -> tuple[Path, Path]:
     return outlet_log_filename, inlet_log_filename
 
 
+def parse_log_filename(log_file: Path) -> dict[str, str]:
+    # id-0_outlet-pylsl_datatype-counter_..._window-1_chunk-1.csv -> {"id": "0", ...}
+    return dict(part.split("-", 1) for part in log_file.stem.split("_"))
+
+
 def extract_metainfo(log_files: list[Path]):
-    ids = [f.name.split("_")[0].split("-")[-1] for f in log_files]
+    infos = [parse_log_filename(f) for f in log_files]
 
     xlets = {
-        f.name.split("_")[1].split("-")[0]: f.name.split("_")[1].split("-")[-1]
-        for f in log_files
+        xlet: info[xlet]
+        for info in infos
+        for xlet in ["inlet", "outlet"]
+        if xlet in info
     }
 
-    datatype = [f.name.split("_")[2].split("-")[-1] for f in log_files]
-    platform = [f.name.split("_")[3].split("-")[-1] for f in log_files]
-    multiproc = [f.name.split("_")[4].split("-")[-1] for f in log_files]
-    fs = [f.name.split("_")[5].split("-")[-1] for f in log_files]
-    window_size = [f.name.split("_")[6].split("-")[-1].split(".")[0] for f in log_files]
-
-    assert (
-        len(set(ids)) == 1
-        and len(set(datatype)) == 1
-        and len(set(platform)) == 1
-        and len(set(multiproc)) == 1
-        and len(set(fs)) == 1
-        and len(set(window_size)) == 1
+    # every field except the xlet name has to match between inlet and outlet
+    shared_infos = [
+        {k: v for k, v in info.items() if k not in ["inlet", "outlet"]}
+        for info in infos
+    ]
+    info = shared_infos[0]
+    mismatched = sorted(
+        {
+            k
+            for other in shared_infos[1:]
+            for k in info.keys() | other.keys()
+            if info.get(k) != other.get(k)
+        }
     )
+    if mismatched:
+        raise ValueError(
+            f"Run {info.get('id')}: inlet and outlet logs differ in {mismatched}."
+        )
 
     meta_info_run = {
-        "id": int(ids[0]),
+        "id": int(info["id"]),
         "inlet": xlets["inlet"],
         "outlet": xlets["outlet"],
-        "datatype": datatype[0],
-        "platform": platform[0],
-        "multiproc": multiproc[0] == "True",
-        "fs": int(fs[0]),
-        "window_size": int(window_size[0]),
+        "datatype": info["datatype"],
+        "platform": info["platform"],
+        "multiproc": info["multiproc"] == "True",
+        "fs": int(info["fs"]),
+        "window_size": int(info["window"]),
+        # logs written before these options existed used one sample per call,
+        # a single channel and time_correction() per sample
+        "chunk": int(info.get("chunk", 1)),
+        "channels": int(info.get("channels", 1)),
+        "clocksync": info.get("clocksync", "sample"),
     }
 
     return meta_info_run
 
 
-def verify_data_loss(
-    df_outlet: pl.DataFrame, df_inlet: pl.DataFrame, window_size: int
-) -> bool:
-    # outlet is started first and the the inlet.
-    # the inlet will miss a few samples in the beginning in the time it takes
-    # to establish connection between the inlet and the outlet.
+def get_sequence_stats(df_outlet: pl.DataFrame, df_inlet: pl.DataFrame) -> dict:
+    # the outlet only starts pacing once the inlet subscribed (start barrier),
+    # so samples before the first received one are only expected for runs
+    # where the barrier timed out or logs predating it. these are counted
+    # separately as startup loss.
 
-    # this function verifies if all the data in the inlet is present in the outlet
-    # i.e. is the inlet a continuous subset of the outlet
+    # the counter values are integers, so every check below is a diff or a
+    # bincount over the received sequence, O(n) in the number of samples.
 
-    outlet_number_arr = df_outlet["x"].to_numpy()
+    outlet_number_arr = df_outlet["x"].to_numpy().astype(np.int64)
+    inlet_number_arr = df_inlet["x"].to_numpy().astype(np.int64)
 
-    if window_size == 1:
-        inlet_number_arr = df_inlet["x"].to_numpy()
-    else:
-        inlet_number_arr = df_inlet["x"].explode().to_numpy()
+    if len(inlet_number_arr) == 0 or len(outlet_number_arr) == 0:
+        return {
+            "n_outlet": len(outlet_number_arr),
+            "n_inlet": len(inlet_number_arr),
+            "n_startup_loss": len(outlet_number_arr),
+            "n_missing": 0,
+            "n_duplicated": 0,
+            "n_out_of_order": 0,
+            "longest_gap": 0,
+            "is_data_loss": len(outlet_number_arr) > 0,
+        }
 
     first_inlet_number = inlet_number_arr[0]
-    first_inlet_number_idx_in_outlet = np.where(
-        outlet_number_arr == first_inlet_number
-    )[0].item()
-
-    outlet_number_subset = outlet_number_arr[first_inlet_number_idx_in_outlet:]
-
-    try:
-        return not all(inlet_number_arr == outlet_number_subset)
-    except Exception as e:
-        logger.error(e)
-        return True
+    n_startup_loss = np.count_nonzero(outlet_number_arr < first_inlet_number)
+
+    # how often each sent value was received, indexed by value - min value
+    min_number = outlet_number_arr.min()
+    n_numbers = outlet_number_arr.max() - min_number + 1
+    inlet_idx = inlet_number_arr - min_number
+    inlet_idx = inlet_idx[(inlet_idx >= 0) & (inlet_idx < n_numbers)]
+    received_count = np.bincount(inlet_idx, minlength=n_numbers)
+
+    is_expected = np.zeros(n_numbers, dtype=bool)
+    is_expected[outlet_number_arr - min_number] = True
+    is_expected[: max(first_inlet_number - min_number, 0)] = False
+
+    steps = np.diff(inlet_number_arr)
+    gaps = steps[steps > 1] - 1
+
+    n_missing = np.count_nonzero(is_expected & (received_count == 0))
+    n_duplicated = np.sum(np.maximum(received_count - 1, 0))
+    n_out_of_order = np.count_nonzero(steps < 0)
+
+    return {
+        "n_outlet": len(outlet_number_arr),
+        "n_inlet": len(inlet_number_arr),
+        "n_startup_loss": int(n_startup_loss),
+        "n_missing": int(n_missing),
+        "n_duplicated": int(n_duplicated),
+        "n_out_of_order": int(n_out_of_order),
+        "longest_gap": int(gaps.max()) if len(gaps) > 0 else 0,
+        "is_data_loss": bool(n_missing > 0 or n_duplicated > 0 or n_out_of_order > 0),
+    }
 
 
 def get_window_duration(
     df_inlet: pl.DataFrame, window_size: int
 ) -> tuple[float | None, float | None]:
     if window_size > 1:
-        window_latency = df_inlet.with_columns(
-            (
-                pl.col("t_gen_outlet").list.last() - pl.col("t_gen_outlet").list.first()
-            ).alias("window_time")
-        )["window_time"].to_numpy()
+        window_latency = (
+            df_inlet.group_by("window", maintain_order=True)
+            .agg(
+                (pl.col("t_gen_outlet").last() - pl.col("t_gen_outlet").first()).alias(
+                    "window_time"
+                )
+            )["window_time"]
+            .to_numpy()
+        )
 
         return np.mean(window_latency).item(), np.std(window_latency).item()
     else:
@@ -107,8 +201,8 @@ def get_window_duration(
 
 
 def get_average_latency(df_inlet: pl.DataFrame) -> tuple[float | None, float | None]:
-    t_gen_outlet = df_inlet["t_gen_outlet"].explode().to_numpy()
-    t_arr_inlet = df_inlet["t_arr_inlet"].explode().to_numpy()
+    t_gen_outlet = df_inlet["t_gen_outlet"].to_numpy()
+    t_arr_inlet = df_inlet["t_arr_inlet"].to_numpy()
 
     return (
         np.mean(t_arr_inlet - t_gen_outlet).item(),
@@ -116,79 +210,605 @@ def get_average_latency(df_inlet: pl.DataFrame) -> tuple[float | None, float | N
     )
 
 
-def analyse() -> None:
-    basepath_logfiles = Path("./logs/")
-    log_files = list(basepath_logfiles.glob("*.csv"))
+def fill_clock_offsets(
+    df_inlet: pl.DataFrame, clocksync: str, offset_updates: list
+) -> pl.DataFrame:
+    # t_lsl_offset for every sample. flags mode timestamps are already in the
+    # inlet clock, interval mode offsets are joined back from the sparse
+    # series in the run stats (last refresh before the sample arrived).
+    if clocksync == "flags":
+        return df_inlet.with_columns(pl.lit(0.0).alias("t_lsl_offset"))
+
+    df_inlet = df_inlet.with_columns(pl.col("t_lsl_offset").fill_nan(None))
+
+    if len(offset_updates) > 0:
+        df_updates = pl.DataFrame(
+            offset_updates, schema=["t_arr_inlet", "offset"], orient="row"
+        ).sort("t_arr_inlet")
+        df_inlet = (
+            df_inlet.with_row_index("row")
+            .sort("t_arr_inlet")
+            .join_asof(df_updates, on="t_arr_inlet", strategy="backward")
+            .sort("row")
+            .with_columns(pl.coalesce("t_lsl_offset", "offset").alias("t_lsl_offset"))
+            .drop("row", "offset")
+        )
 
-    # "id": None,
-    # "outlet": None,
-    # "inlet": None,
-    # "datatype": None,
-    # "platform": None,
-    # "multiproc": None,
-    # "fs": None,
-    # "window_size": None,
-    dict_for_df = []
+    return df_inlet.with_columns(pl.col("t_lsl_offset").forward_fill().backward_fill())
 
-    # get all run_ids
-    run_ids = [int(f.name.split("_")[0].split("-")[-1]) for f in log_files]
-    run_ids = sorted(list(set(run_ids)))
 
-    for run_id in run_ids:
-        logfiles = [
-            f for f in log_files if f.name.split("_")[0].split("-")[-1] == str(run_id)
-        ]
+def get_clock_offset_stats(df_inlet: pl.DataFrame) -> dict:
+    offset = df_inlet["t_lsl_offset"].to_numpy()
+    # outlet timestamps mapped into the inlet clock
+    latency = df_inlet["t_arr_inlet"].to_numpy() - (
+        df_inlet["t_gen_outlet"].to_numpy() + offset
+    )
+
+    if len(offset) == 0 or np.isnan(offset).all():
+        return {
+            "avg_clock_offset": None,
+            "std_clock_offset": None,
+            "avg_latency_corrected": None,
+            "std_latency_corrected": None,
+        }
+
+    return {
+        "avg_clock_offset": np.nanmean(offset).item(),
+        "std_clock_offset": np.nanstd(offset).item(),
+        "avg_latency_corrected": np.nanmean(latency).item(),
+        "std_latency_corrected": np.nanstd(latency).item(),
+    }
+
+
+def get_clock_drift_stats(df_inlet: pl.DataFrame) -> dict:
+    # drift of the clock offset over the run, from a robust linear fit of the
+    # distinct offset estimates (liblsl refreshes them every few seconds,
+    # repeated values in between carry no information)
+    t_arr_inlet = df_inlet["t_arr_inlet"].to_numpy()
+    offset = df_inlet["t_lsl_offset"].to_numpy()
+
+    is_estimate = np.concatenate([[True], np.diff(offset) != 0]) & ~np.isnan(offset)
+    t, y = t_arr_inlet[is_estimate], offset[is_estimate]
+
+    if len(y) < 3:
+        return {
+            "n_offset_estimates": len(y),
+            "clock_drift_ppm": None,
+            "clock_offset_residual_std": None,
+            "clock_offset_residual_max": None,
+            "avg_latency_drift_corrected": None,
+            "std_latency_drift_corrected": None,
+            "n_clock_jumps": 0,
+            "max_clock_jump": None,
+            "is_clock_jump": False,
+        }
+
+    slope, intercept, residuals = huber_fit(t, y)
+
+    # offset steps between estimates that the drift does not explain, judged
+    # against their own spread (a jump inflates the residuals of the fit)
+    steps = np.diff(y) - slope * np.diff(t)
+    threshold = max(CLOCK_JUMP_MIN, JUMP_SCALES * robust_scale(steps))
+    n_jumps = int(np.count_nonzero(np.abs(steps) > threshold))
+
+    # latency with the fitted offset instead of the raw estimates
+    latency = t_arr_inlet - (
+        df_inlet["t_gen_outlet"].to_numpy() + intercept + slope * t_arr_inlet
+    )
+
+    return {
+        "n_offset_estimates": len(y),
+        "clock_drift_ppm": 1e6 * slope,
+        "clock_offset_residual_std": np.std(residuals).item(),
+        "clock_offset_residual_max": np.max(np.abs(residuals)).item(),
+        "avg_latency_drift_corrected": np.mean(latency).item(),
+        "std_latency_drift_corrected": np.std(latency).item(),
+        "n_clock_jumps": n_jumps,
+        "max_clock_jump": np.max(np.abs(steps)).item(),
+        "is_clock_jump": n_jumps > 0,
+    }
+
+
+def get_latency_distribution(df_inlet: pl.DataFrame) -> dict:
+    latency = (df_inlet["t_arr_inlet"] - df_inlet["t_gen_outlet"]).to_numpy()
+
+    if len(latency) == 0:
+        return {
+            **{k: None for k in LATENCY_PERCENTILES},
+            "latency_max": None,
+            "latency_hist": None,
+        }
+
+    latency_hist = latency_histogram(latency)
+    latency_max = np.max(latency).item()
+    # bucket midpoints can overshoot the largest value in the top bucket
+    percentiles = [
+        min(p, latency_max)
+        for p in histogram_percentiles(latency_hist, list(LATENCY_PERCENTILES.values()))
+    ]
+
+    return {
+        **dict(zip(LATENCY_PERCENTILES, percentiles)),
+        "latency_max": latency_max,
+        "latency_hist": latency_hist.tolist(),
+    }
 
-        if len(logfiles) != 2:
-            raise ValueError(
-                f"More or less than the required 2 files; one for each outlet and inlet.\n{logfiles}"
-            )
 
-        meta_info = extract_metainfo(log_files=logfiles)
-        outlet_log_filename, inlet_log_filename = assign_xlet_filename(
-            log_files=logfiles
+def get_generation_interval_stats(df_outlet: pl.DataFrame, fs: int) -> dict:
+    # error of the outlet's inter-generation intervals against 1/fs
+    error = np.diff(df_outlet["t_gen_outlet"].to_numpy()) - 1 / fs
+
+    if len(error) == 0:
+        return {
+            "gen_interval_error_mean": None,
+            "gen_interval_error_std": None,
+            "gen_interval_error_p99": None,
+        }
+
+    return {
+        "gen_interval_error_mean": np.mean(error).item(),
+        "gen_interval_error_std": np.std(error).item(),
+        "gen_interval_error_p99": np.percentile(np.abs(error), 99).item(),
+    }
+
+
+def get_arrival_interval_stats(df_inlet: pl.DataFrame) -> dict:
+    # distribution of the intervals between consecutive arrivals, and bursts
+    # of samples arriving within BURST_INTERVAL of each other
+    interval = np.diff(df_inlet["t_arr_inlet"].to_numpy())
+
+    if len(interval) == 0:
+        return {
+            "arrival_interval_p50": None,
+            "arrival_interval_p99": None,
+            "arrival_interval_max": None,
+            "arrival_interval_std": None,
+            "n_bursts": 0,
+            "max_burst_length": 0,
+            "burst_fraction": None,
+        }
+
+    # a burst of k samples is a run of k - 1 short intervals
+    is_short = np.concatenate([[False], interval < BURST_INTERVAL, [False]])
+    edges = np.flatnonzero(np.diff(is_short.astype(np.int8)))
+    run_lengths = edges[1::2] - edges[::2]
+
+    p50, p99 = np.percentile(interval, [50, 99])
+
+    return {
+        "arrival_interval_p50": p50.item(),
+        "arrival_interval_p99": p99.item(),
+        "arrival_interval_max": np.max(interval).item(),
+        "arrival_interval_std": np.std(interval).item(),
+        "n_bursts": len(run_lengths),
+        "max_burst_length": int(run_lengths.max()) + 1 if len(run_lengths) else 0,
+        "burst_fraction": (run_lengths.sum() + len(run_lengths)) / (len(interval) + 1),
+    }
+
+
+def get_latency_spectrum(df_inlet: pl.DataFrame, fs: int) -> dict:
+    # welch spectrum of the latency series, sampled once per sample (fs).
+    # periodic stalls (timer ticks, gc cycles) show up as peaks.
+    latency = (df_inlet["t_arr_inlet"] - df_inlet["t_gen_outlet"]).to_numpy()
+    freqs, psd = welch_psd(latency, fs)
+
+    if len(psd) < 3:
+        return {
+            "latency_psd_peak_hz": None,
+            "latency_psd_peak_ratio": None,
+            "latency_psd_df": None,
+            "latency_psd": None,
+        }
+
+    # strongest bin above dc, against the median level of the spectrum
+    peak = np.argmax(psd[1:]) + 1
+    median = np.median(psd[1:])
+
+    return {
+        "latency_psd_peak_hz": freqs[peak].item(),
+        "latency_psd_peak_ratio": (psd[peak] / median).item() if median > 0 else None,
+        "latency_psd_df": freqs[1].item(),
+        "latency_psd": psd.tolist(),
+    }
+
+
+def merge_latency_histograms(final_df: pl.DataFrame) -> pl.DataFrame:
+    # latency percentiles of all repetitions of a combo, from the stored
+    # histograms alone
+    rows = []
+
+    for combo, df_combo in final_df.filter(
+        pl.col("latency_hist").is_not_null()
+    ).group_by(COMBO_COLUMNS, maintain_order=True):
+        latency_hist = merge_histograms(
+            [np.array(h) for h in df_combo["latency_hist"].to_list()]
         )
+        latency_max = df_combo["latency_max"].max()
+        percentiles = [
+            min(p, latency_max)
+            for p in histogram_percentiles(
+                latency_hist, list(LATENCY_PERCENTILES.values())
+            )
+        ]
 
-        df_outlet = pl.read_csv(outlet_log_filename).with_columns(
-            pl.col("x").cast(pl.Float64),
+        rows.append(
+            {
+                **dict(zip(COMBO_COLUMNS, combo)),
+                "n_runs": len(df_combo),
+                **dict(zip(LATENCY_PERCENTILES, percentiles)),
+                "latency_max": latency_max,
+            }
         )
 
-        if meta_info["window_size"] == 1:
-            df_inlet = pl.read_csv(inlet_log_filename)
-        else:
-            df_inlet = pl.read_csv(inlet_log_filename).with_columns(
+    return pl.from_dicts(rows)
+
+
+def get_telemetry_stats(telemetry_file: Path, n_samples: dict[str, int]) -> dict:
+    # cpu and memory of every role over all of its processes, from the
+    # telemetry sampled by the scheduler
+    stats = {}
+
+    df = pl.read_csv(telemetry_file) if telemetry_file.exists() else None
+
+    for role in XLET_ROLES:
+        df_role = df.filter(pl.col("role") == role) if df is not None else None
+
+        if df_role is None or len(df_role) == 0:
+            stats |= {
+                f"cpu_s_per_msample_{role}": None,
+                f"peak_rss_mb_{role}": None,
+                f"voluntary_switches_{role}": None,
+                f"involuntary_switches_{role}": None,
+                f"max_threads_{role}": None,
+            }
+            continue
+
+        # counters are cumulative, the last sample of each process holds its total
+        df_last = df_role.sort("t").group_by("pid").last()
+        # processes of a role sampled in the same tick add up
+        df_ticks = df_role.group_by("t").agg(pl.col("rss", "threads").sum())
+        cpu_seconds = df_last["cpu_time"].sum()
+
+        stats |= {
+            f"cpu_s_per_msample_{role}": 1e6 * cpu_seconds / n_samples[role]
+            if n_samples[role] > 0
+            else None,
+            f"peak_rss_mb_{role}": df_ticks["rss"].max() / 2**20,
+            f"voluntary_switches_{role}": df_last["voluntary_switches"].sum(),
+            f"involuntary_switches_{role}": df_last["involuntary_switches"].sum(),
+            f"max_threads_{role}": df_ticks["threads"].max(),
+        }
+
+    return stats
+
+
+def summarize_telemetry(final_df: pl.DataFrame) -> pl.DataFrame:
+    # resource cost per combo over all of its repetitions
+    return final_df.group_by(COMBO_COLUMNS, maintain_order=True).agg(
+        *[pl.col(f"cpu_s_per_msample_{role}").mean() for role in XLET_ROLES],
+        *[pl.col(f"peak_rss_mb_{role}").max() for role in XLET_ROLES],
+    )
+
+
+def scan_outlet_log(log_file_name: Path) -> pl.LazyFrame:
+    if log_file_name.suffix == ".arrow":
+        return pl.scan_ipc(log_file_name)
+
+    return pl.scan_csv(log_file_name).with_columns(
+        pl.col("x").cast(pl.Float64).cast(pl.Int64),
+    )
+
+
+def scan_inlet_log(log_file_name: Path, window_size: int) -> pl.LazyFrame:
+    # one row per sample with the id of the window it was logged in
+    if log_file_name.suffix == ".arrow":
+        return pl.scan_ipc(log_file_name)
+
+    if window_size == 1:
+        # offsets not sampled by the clocksync mode are logged as nan
+        lf_inlet = pl.scan_csv(
+            log_file_name, schema_overrides={"t_lsl_offset": pl.Float64}
+        ).with_row_index("window")
+    else:
+        lf_inlet = (
+            pl.scan_csv(log_file_name)
+            .with_columns(
                 pl.col("x").str.split(";").cast(pl.List(pl.Float64)),
                 pl.col("t_gen_outlet").str.split(";").cast(pl.List(pl.Float64)),
                 pl.col("t_lsl_offset").str.split(";").cast(pl.List(pl.Float64)),
                 pl.col("t_arr_inlet").str.split(";").cast(pl.List(pl.Float64)),
             )
-
-        avg_latency, std_latency = get_average_latency(df_inlet=df_inlet)
-        is_data_loss = verify_data_loss(
-            df_outlet=df_outlet, df_inlet=df_inlet, window_size=meta_info["window_size"]
+            .with_row_index("window")
+            .explode(["t_gen_outlet", "t_lsl_offset", "t_arr_inlet", "x"])
         )
-        avg_window_duration, std_window_duration = get_window_duration(
-            df_inlet=df_inlet, window_size=meta_info["window_size"]
+
+    return lf_inlet.with_columns(
+        pl.col("window").cast(pl.Int64),
+        pl.col("x").cast(pl.Float64).cast(pl.Int64),
+    )
+
+
+def get_throughput(df_inlet: pl.DataFrame) -> float | None:
+    t_arr_inlet = df_inlet["t_arr_inlet"].to_numpy()
+
+    if len(t_arr_inlet) < 2 or t_arr_inlet[-1] == t_arr_inlet[0]:
+        return None
+
+    return (len(t_arr_inlet) - 1) / (t_arr_inlet[-1] - t_arr_inlet[0]).item()
+
+
+def group_log_files(log_files: list[Path]) -> dict[int, list[Path]]:
+    run_logfiles = defaultdict(list)
+
+    for f in log_files:
+        run_logfiles[int(parse_log_filename(f)["id"])].append(f)
+
+    return dict(sorted(run_logfiles.items()))
+
+
+def file_fingerprint(file_name: Path, n_bytes: int = 65_536) -> bytes:
+    # size and mtime catch almost every change, the hash of the head and
+    # tail guards against copies that preserve both without reading it all
+    stat = file_name.stat()
+    digest = hashlib.blake2b(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+
+    with open(file_name, "rb") as file:
+        digest.update(file.read(n_bytes))
+        if stat.st_size > n_bytes:
+            file.seek(max(stat.st_size - n_bytes, n_bytes))
+            digest.update(file.read())
+
+    return digest.digest()
+
+
+def run_cache_key(run_id: int, logfiles: list[Path]) -> str:
+    digest = hashlib.blake2b(f"{ANALYSIS_VERSION}:{run_id}".encode())
+
+    for f in sorted(logfiles):
+        digest.update(f.name.encode())
+        digest.update(file_fingerprint(f))
+
+        # run stats feed into the results as well
+        stats_file = stats_file_name(f)
+        if stats_file.exists():
+            digest.update(file_fingerprint(stats_file))
+
+    telemetry_file = telemetry_file_name(logfiles[0].parent, run_id)
+    if telemetry_file.exists():
+        digest.update(file_fingerprint(telemetry_file))
+
+    return digest.hexdigest()
+
+
+def load_cache(cache_file: Path) -> dict[str, dict]:
+    if not cache_file.exists():
+        return {}
+
+    try:
+        rows = pl.read_parquet(cache_file).to_dicts()
+    except Exception as e:
+        logger.error(f"Ignoring unreadable analysis cache {cache_file}: {e}")
+        return {}
+
+    return {row.pop("cache_key"): row for row in rows}
+
+
+def save_cache(cache_file: Path, cache: dict[str, dict]) -> None:
+    if len(cache) == 0:
+        return
+
+    pl.from_dicts([{"cache_key": k, **row} for k, row in cache.items()]).write_parquet(
+        cache_file
+    )
+
+
+def analyse_run(logfiles: list[Path]) -> dict:
+    if len(logfiles) != 2:
+        raise ValueError(
+            f"More or less than the required 2 files; one for each outlet and inlet.\n{logfiles}"
         )
 
-        dict_for_df.append(
-            {
-                **meta_info,
-                **{
-                    "is_data_loss": is_data_loss,
-                    "avg_window_duration": avg_window_duration,
-                    "std_window_duration": std_window_duration,
-                    "avg_latency": avg_latency,
-                    "std_latency": std_latency,
-                },
+    meta_info = extract_metainfo(log_files=logfiles)
+    outlet_log_filename, inlet_log_filename = assign_xlet_filename(log_files=logfiles)
+
+    # only the columns used below are read, with the streaming engine
+    df_outlet = (
+        scan_outlet_log(outlet_log_filename)
+        .select("t_gen_outlet", "x")
+        .collect(engine="streaming")
+    )
+    df_inlet = (
+        scan_inlet_log(inlet_log_filename, meta_info["window_size"])
+        .select("window", "t_gen_outlet", "t_lsl_offset", "t_arr_inlet", "x")
+        .collect(engine="streaming")
+    )
+    stats_outlet = read_run_stats(outlet_log_filename)
+    stats_inlet = read_run_stats(inlet_log_filename)
+    df_inlet = fill_clock_offsets(
+        df_inlet, meta_info["clocksync"], stats_inlet.get("offset_updates", [])
+    )
+
+    avg_latency, std_latency = get_average_latency(df_inlet=df_inlet)
+    latency_distribution = get_latency_distribution(df_inlet=df_inlet)
+    sequence_stats = get_sequence_stats(df_outlet=df_outlet, df_inlet=df_inlet)
+    avg_window_duration, std_window_duration = get_window_duration(
+        df_inlet=df_inlet, window_size=meta_info["window_size"]
+    )
+    throughput = get_throughput(df_inlet=df_inlet)
+    # every channel is a float32 on the wire
+    throughput_bytes = (
+        throughput * meta_info["channels"] * 4 if throughput is not None else None
+    )
+    clock_offset_stats = get_clock_offset_stats(df_inlet=df_inlet)
+    clock_drift_stats = get_clock_drift_stats(df_inlet=df_inlet)
+    generation_interval_stats = get_generation_interval_stats(
+        df_outlet=df_outlet, fs=meta_info["fs"]
+    )
+    arrival_interval_stats = get_arrival_interval_stats(df_inlet=df_inlet)
+    latency_spectrum = get_latency_spectrum(df_inlet=df_inlet, fs=meta_info["fs"])
+    telemetry_stats = get_telemetry_stats(
+        telemetry_file_name(inlet_log_filename.parent, meta_info["id"]),
+        {
+            "outlet": sequence_stats["n_outlet"],
+            "inlet": sequence_stats["n_inlet"],
+        },
+    )
+    pacing = stats_outlet.get("pacing", {})
+
+    return {
+        **meta_info,
+        **{
+            **sequence_stats,
+            "avg_window_duration": avg_window_duration,
+            "std_window_duration": std_window_duration,
+            "avg_latency": avg_latency,
+            "std_latency": std_latency,
+            **latency_distribution,
+            **clock_offset_stats,
+            # latency shift from applying the offset correction
+            "latency_correction": avg_latency
+            - clock_offset_stats["avg_latency_corrected"]
+            if clock_offset_stats["avg_latency_corrected"] is not None
+            else None,
+            **clock_drift_stats,
+            **generation_interval_stats,
+            **arrival_interval_stats,
+            **latency_spectrum,
+            "throughput": throughput,
+            "throughput_bytes": throughput_bytes,
+            "cpu_time_per_sample_outlet": stats_outlet.get("cpu_time_per_sample"),
+            "cpu_time_per_sample_inlet": stats_inlet.get("cpu_time_per_sample"),
+            "log_overflow_outlet": stats_outlet.get("n_log_overflow"),
+            "log_overflow_inlet": stats_inlet.get("n_log_overflow"),
+            "connection_setup_outlet": stats_outlet.get("connection_setup_time"),
+            "connection_setup_inlet": stats_inlet.get("connection_setup_time"),
+            "pacing_jitter_p50": pacing.get("jitter_p50"),
+            "pacing_jitter_p99": pacing.get("jitter_p99"),
+            "pacing_max_burst": max(
+                map(int, pacing.get("burst_histogram", {})), default=None
+            ),
+            **telemetry_stats,
+        },
+    }
+
+
+def try_analyse_run(run_id: int, logfiles: list[Path]) -> dict | None:
+    # a broken or half-written run is logged and skipped, the others are
+    # still analysed
+    try:
+        return analyse_run(logfiles)
+    except Exception as e:
+        logger.warning(f"skipping run {run_id}: {type(e).__name__}: {e}")
+        return None
+
+
+@click.command()
+@click.option(
+    "--logdir",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    help="Directory with the xlet logs.",
+    default=Path("./logs/"),
+)
+@click.option(
+    "--cache/--no-cache",
+    help="Reuse results of unchanged runs from the cache in the log directory.",
+    default=True,
+)
+@click.option(
+    "--workers",
+    type=click.INT,
+    help="Runs analysed in parallel (default: number of cores).",
+    default=None,
+)
+def analyse(logdir: Path, cache: bool, workers: int | None) -> None:
+    log_files = [
+        f for log_format in LOG_FORMATS.values() for f in logdir.glob(f"*{log_format}")
+    ]
+
+    # "id": None,
+    # "outlet": None,
+    # "inlet": None,
+    # "datatype": None,
+    # "platform": None,
+    # "multiproc": None,
+    # "fs": None,
+    # "window_size": None,
+    # "chunk": None,
+    # "channels": None,
+    run_logfiles = group_log_files(log_files)
+
+    if len(run_logfiles) == 0:
+        logger.info(f"No logs found in {logdir}.")
+        return
+
+    cache_file = logdir / CACHE_FILE_NAME
+    cached_rows = load_cache(cache_file) if cache else {}
+
+    cache_keys = {
+        run_id: run_cache_key(run_id, logfiles)
+        for run_id, logfiles in run_logfiles.items()
+    }
+    stale_run_ids = [
+        run_id for run_id, key in cache_keys.items() if key not in cached_rows
+    ]
+    logger.info(
+        f"{len(run_logfiles) - len(stale_run_ids)} cached runs, {len(stale_run_ids)} to analyse"
+    )
+
+    workers = workers or os.cpu_count() or 1
+
+    # spawned workers each get their share of the polars thread pool,
+    # forking a process that already runs polars threads is unsafe
+    polars_threads = os.environ.get("POLARS_MAX_THREADS")
+    os.environ["POLARS_MAX_THREADS"] = str(max(1, (os.cpu_count() or 1) // workers))
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = {
+                executor.submit(try_analyse_run, run_id, run_logfiles[run_id]): run_id
+                for run_id in stale_run_ids
             }
-        )
+            try:
+                for future in as_completed(futures):
+                    row = future.result()
+                    if row is not None:
+                        cached_rows[cache_keys[futures[future]]] = row
+            finally:
+                # on an interrupt the runs not started yet are dropped
+                executor.shutdown(cancel_futures=True)
+    finally:
+        if polars_threads is None:
+            del os.environ["POLARS_MAX_THREADS"]
+        else:
+            os.environ["POLARS_MAX_THREADS"] = polars_threads
+
+        # finished runs are kept even if the analysis did not complete. only
+        # runs still present in the log directory are kept in the cache,
+        # skipped runs are not cached and analysed again next time.
+        run_keys = set(cache_keys.values())
+        cached_rows = {k: row for k, row in cached_rows.items() if k in run_keys}
+        save_cache(cache_file, cached_rows)
+
+    dict_for_df = [
+        cached_rows[cache_keys[run_id]]
+        for run_id in run_logfiles
+        if cache_keys[run_id] in cached_rows
+    ]
+    if len(dict_for_df) == 0:
+        logger.info(f"No run in {logdir} could be analysed.")
+        return
 
     final_df = pl.from_dicts(dict_for_df)
     pl.Config.set_tbl_rows(999)
     pl.Config.set_tbl_cols(999)
 
-    print(final_df)
+    final_df.write_parquet(logdir / RESULTS_FILE_NAME)
+
+    print(final_df.drop("latency_hist", "latency_psd"))
+    print(merge_latency_histograms(final_df))
+    print(summarize_telemetry(final_df))
 
 
 if __name__ == "__main__":
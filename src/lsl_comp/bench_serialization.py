@@ -0,0 +1,106 @@
+import time
+from collections.abc import Callable
+
+import click
+import numpy as np
+import polars as pl
+from ezmsg.core.messagemarshal import MessageMarshal
+from ezmsg.util.messages.axisarray import AxisArray
+
+from lsl_comp.ez_utils.message import Message, SampleBatch
+from lsl_comp.utils.logwriter import INLET_COLUMNS
+
+# serialization cost of the messages crossing process boundaries when
+# multiproc=True. every candidate goes through ezmsg's own wire format
+# (pickle protocol 5 with out-of-band buffers), dumped and loaded again.
+
+
+def make_messages(n: int) -> dict[str, Callable[[], list]]:
+    sample = np.arange(n, dtype=np.float64)
+    timestamp = 1000.0 + sample / 1000
+    ch_axis = AxisArray.CoordinateAxis(data=np.array(["counter"]), dims=["ch"])
+
+    return {
+        # one message per sample
+        "message": lambda: [
+            Message(sample=s, timestamp=t)
+            for s, t in zip(sample.tolist(), timestamp.tolist())
+        ],
+        "csv": lambda: [
+            f"{t},{0.0},{t},{int(s)}"
+            for s, t in zip(sample.tolist(), timestamp.tolist())
+        ],
+        # one message per block
+        "ndarray": lambda: [np.zeros((n, len(INLET_COLUMNS)))],
+        "axisarray": lambda: [
+            AxisArray(
+                data=sample[:, None],
+                dims=["time", "ch"],
+                axes={
+                    "time": AxisArray.TimeAxis(fs=1000, offset=timestamp[0]),
+                    "ch": ch_axis,
+                },
+            )
+        ],
+        "batch": lambda: [SampleBatch.from_arrays(sample, timestamp)],
+    }
+
+
+def measure(make: Callable[[], list], n: int, repeats: int) -> dict:
+    # construction and serialization are timed apart, the messages are built
+    # once and the same ones are dumped and loaded on every repeat
+    messages = make()
+
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        make()
+    construct_time = time.perf_counter() - start_time
+
+    n_bytes = 0
+    start_time = time.perf_counter()
+
+    for _ in range(repeats):
+        for message in messages:
+            buffers = MessageMarshal.dump(message)
+            n_bytes += sum(len(b) for b in buffers)
+            MessageMarshal.load(buffers)
+
+    elapsed_time = time.perf_counter() - start_time
+
+    return {
+        "us_per_sample": 1e6 * elapsed_time / (repeats * n),
+        "bytes_per_sample": n_bytes / (repeats * n),
+        "construct_us_per_sample": 1e6 * construct_time / (repeats * n),
+    }
+
+
+@click.command()
+@click.option(
+    "--batch-size",
+    type=click.INT,
+    multiple=True,
+    help="Samples per block (repeatable).",
+    default=[1, 10, 100, 1000],
+)
+@click.option(
+    "--samples", type=click.INT, help="Samples measured per case.", default=100_000
+)
+def main(batch_size: list[int], samples: int) -> None:
+    results = []
+
+    for n in batch_size:
+        for name, make in make_messages(n).items():
+            results.append(
+                {
+                    "message_type": name,
+                    "batch_size": n,
+                    **measure(make, n, repeats=max(samples // n, 1)),
+                }
+            )
+
+    with pl.Config(tbl_rows=-1):
+        print(pl.DataFrame(results).sort("batch_size", "us_per_sample"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import math
+import shutil
+from collections.abc import Callable
+from pathlib import Path
+
+import polars as pl
+
+from lsl_comp.telemetry import telemetry_file_name
+from lsl_comp.utils.logwriter import LOG_FORMATS
+from lsl_comp.utils.runstats import stats_file_name
+
+# experiment --capacity: per combo and channel count, the highest sampling
+# rate a run sustains with zero loss and a bounded p99 latency. probe runs
+# are numbered from CAPACITY_ID_BASE so they never clash with sweep runs,
+# their logs are moved to logs/capacity/probes once analysed.
+CAPACITY_DIR = "capacity"
+PROBES_DIR = "probes"
+CAPACITY_ID_BASE = 1_000_000
+
+
+def run_log_files(logdir: Path, run_id: int) -> list[Path]:
+    return [
+        f for f in logdir.glob(f"id-{run_id}_*") if f.suffix in LOG_FORMATS.values()
+    ]
+
+
+def archive_run(logdir: Path, run_id: int) -> None:
+    # keeps the probe analysable with analyse --logdir logs/capacity/probes
+    probes_dir = logdir / CAPACITY_DIR / PROBES_DIR
+
+    for log_file in run_log_files(logdir, run_id):
+        for f in [log_file, stats_file_name(log_file)]:
+            if f.exists():
+                probes_dir.mkdir(parents=True, exist_ok=True)
+                shutil.move(f, probes_dir / f.name)
+
+    telemetry_file = telemetry_file_name(logdir, run_id)
+    if telemetry_file.exists():
+        target = telemetry_file_name(probes_dir, run_id)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(telemetry_file, target)
+
+
+def is_sustained(result: dict | None, max_p99: float) -> bool:
+    # result of analyse_run, None when the run failed or left no logs. no
+    # sample may be missing, duplicated or reordered (is_data_loss), nor lost
+    # before the first received one: the outlet waits for the inlet before
+    # pacing. only the nsp streams regardless, so airsignal probes tolerate
+    # losing the samples sent before the inlet connected.
+    if result is None or result["is_data_loss"]:
+        return False
+    if result["n_startup_loss"] > 0 and result["datatype"] != "airsignal":
+        return False
+
+    return result["latency_p99"] is not None and result["latency_p99"] <= max_p99
+
+
+def search_max_fs(
+    passes: Callable[[int], bool], fs_min: int, fs_max: int, tolerance: float
+) -> int | None:
+    # bisection on a log scale, the highest passing fs or None if even fs_min
+    # fails. assumes a run that passes at some fs also passes below it.
+    if not passes(fs_min):
+        return None
+    if passes(fs_max):
+        return fs_max
+
+    lo, hi = fs_min, fs_max
+
+    while hi / lo > 1 + tolerance:
+        mid = round(math.sqrt(lo * hi))
+        if mid in (lo, hi):
+            break
+
+        if passes(mid):
+            lo = mid
+        else:
+            hi = mid
+
+    return lo
+
+
+def write_capacity_curve(logdir: Path, platform: str, rows: list[dict]) -> Path:
+    # one file per platform, later searches are appended
+    file_name = logdir / CAPACITY_DIR / f"capacity_platform-{platform}.csv"
+    file_name.parent.mkdir(parents=True, exist_ok=True)
+
+    df = pl.from_dicts(rows)
+    if file_name.exists():
+        df = pl.concat([pl.read_csv(file_name), df], how="diagonal_relaxed")
+
+    df.write_csv(file_name)
+    return file_name
@@ -1,7 +1,43 @@
 from dataclasses import dataclass
 
+import numpy as np
+from ezmsg.util.messages.axisarray import AxisArray
+
+# one record per sample, stored contiguously so the whole batch is a single
+# out-of-band buffer when ezmsg pickles it into shared memory
+SAMPLE_DTYPE = np.dtype([("sample", np.float64), ("timestamp", np.float64)])
+
 
 @dataclass
 class Message:
     sample: int | float
     timestamp: float
+
+
+@dataclass(slots=True)
+class SampleBatch:
+    records: np.ndarray
+
+    @classmethod
+    def from_arrays(cls, sample: np.ndarray, timestamp: np.ndarray) -> "SampleBatch":
+        records = np.empty(len(sample), dtype=SAMPLE_DTYPE)
+        records["sample"] = sample
+        records["timestamp"] = timestamp
+        return cls(records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+
+def block_timestamps(message: AxisArray) -> np.ndarray:
+    # per-sample timestamps of a block, from the offset and rate of its time axis
+    time_axis = message.axes["time"]
+    return time_axis.offset + time_axis.gain * np.arange(message.data.shape[0])
+
+
+def block_arrays(message: AxisArray | SampleBatch) -> tuple[np.ndarray, np.ndarray]:
+    # counter values and timestamps of a block message
+    if isinstance(message, SampleBatch):
+        return message.records["sample"], message.records["timestamp"]
+
+    return message.data[:, 0], block_timestamps(message)
@@ -1,31 +1,76 @@
+import math
 import asyncio
+from typing import Any
+from pathlib import Path
 from collections.abc import AsyncGenerator
 
+import numpy as np
 import pylsl
 import ezmsg.core as ez
+from ezmsg.util.messages.axisarray import AxisArray
 
-from lsl_comp.ez_utils.message import Message
+from lsl_comp.ez_utils.message import Message, SampleBatch
+from lsl_comp.utils.pacer import Pacer
+from lsl_comp.utils.runstats import write_run_stats
 
 
 class CountSettings(ez.Settings):
     total_count: int
     fs: int
+    spin: float = 0.0
+    # samples per message, above 1 one AxisArray block is sent per pacing tick
+    chunk: int = 1
+    # message type of a block, "axisarray" or "batch" (SampleBatch)
+    block_type: str = "axisarray"
+    # pacing summary is written next to this log file when given
+    log_file_name: Path | None = None
+    # start pacing only after INPUT_READY, i.e. once the inlet subscribed
+    wait_for_consumer: bool = False
+
+
+class CountState(ez.State):
+    ready: asyncio.Event
+    connection_setup_time: float | None
 
 
 class CountUnit(ez.Unit):
     SETTINGS = CountSettings
+    STATE = CountState
+
+    INPUT_READY = ez.InputStream(float)
+    # Message per sample, or AxisArray (time x 1) / SampleBatch per tick in block
+    # mode
+    OUTPUT = ez.OutputStream(Any)
 
-    OUTPUT = ez.OutputStream(Message)
+    def initialize(self) -> None:
+        self.STATE.ready = asyncio.Event()
+        self.STATE.connection_setup_time = None
+
+    @ez.subscriber(INPUT_READY)
+    async def on_ready(self, connection_setup_time: float) -> None:
+        if not math.isnan(connection_setup_time):
+            self.STATE.connection_setup_time = connection_setup_time
+        self.STATE.ready.set()
+
+        # the barrier is passed once, the subscriber is not needed anymore
+        raise ez.Complete
 
     @ez.publisher(OUTPUT)
     async def count(self) -> AsyncGenerator:
-        start_time = pylsl.local_clock()
-        sent_samples = 0
+        if self.SETTINGS.wait_for_consumer:
+            await self.STATE.ready.wait()
+
+        if self.SETTINGS.chunk > 1:
+            async for message in self.count_blocks():
+                yield message
+            raise ez.Complete
+
+        pacer = Pacer(self.SETTINGS.fs, spin=self.SETTINGS.spin)
+        pacer.start()
         n = 0
 
         while n < self.SETTINGS.total_count:
-            elapsed_time = pylsl.local_clock() - start_time
-            required_samples = int(self.SETTINGS.fs * elapsed_time) - sent_samples
+            required_samples = min(pacer.due(), self.SETTINGS.total_count - n)
 
             for _ in range(required_samples):
                 yield (
@@ -34,9 +79,9 @@ class CountUnit(ez.Unit):
                 )
                 n += 1
 
-            sent_samples += required_samples
+            await pacer.async_sleep()
 
-            await asyncio.sleep(1 / self.SETTINGS.fs)
+        self.write_pacing_stats(pacer)
 
         yield (
             self.OUTPUT,
@@ -44,3 +89,53 @@ class CountUnit(ez.Unit):
         )
 
         raise ez.Complete
+
+    def write_pacing_stats(self, pacer: Pacer) -> None:
+        if self.SETTINGS.log_file_name is not None:
+            write_run_stats(
+                self.SETTINGS.log_file_name,
+                {
+                    "connection_setup_time": self.STATE.connection_setup_time,
+                    "pacing": pacer.summary(),
+                },
+            )
+
+    async def count_blocks(self) -> AsyncGenerator:
+        # one message per tick with every sample due, ticks are `chunk`
+        # samples apart. the axes are built once, only data and offset change.
+        fs = self.SETTINGS.fs
+        ch_axis = AxisArray.CoordinateAxis(data=np.array(["counter"]), dims=["ch"])
+        counter = np.arange(self.SETTINGS.total_count, dtype=np.float64)
+
+        def block(data: np.ndarray) -> AxisArray | SampleBatch:
+            # lsl convention: the block is stamped with the time of its last
+            # sample, earlier samples are back-dated by 1 / fs each
+            offset = pylsl.local_clock() - (len(data) - 1) / fs
+
+            if self.SETTINGS.block_type == "batch":
+                return SampleBatch.from_arrays(
+                    data[:, 0], offset + np.arange(len(data)) / fs
+                )
+
+            return AxisArray(
+                data=data,
+                dims=["time", "ch"],
+                axes={"time": AxisArray.TimeAxis(fs=fs, offset=offset), "ch": ch_axis},
+            )
+
+        pacer = Pacer(fs, spin=self.SETTINGS.spin)
+        pacer.start()
+        n = 0
+
+        while n < self.SETTINGS.total_count:
+            required_samples = min(pacer.due(), self.SETTINGS.total_count - n)
+
+            if required_samples > 0:
+                yield (self.OUTPUT, block(counter[n : n + required_samples, None]))
+                n += required_samples
+
+            await pacer.async_sleep(self.SETTINGS.chunk)
+
+        self.write_pacing_stats(pacer)
+
+        yield (self.OUTPUT, block(np.full((1, 1), -1.0)))
@@ -2,18 +2,27 @@ import logging
 from typing import Any
 from pathlib import Path
 
+import numpy as np
 import ezmsg.core as ez
+from ezmsg.util.messages.axisarray import AxisArray
 
-from lsl_comp.ez_utils.message import Message
+from lsl_comp.ez_utils.message import Message, SampleBatch, block_arrays
+from lsl_comp.utils.logwriter import (
+    INLET_COLUMNS,
+    OUTLET_COLUMNS,
+    BackgroundLogWriter,
+    create_log_writer,
+)
 
 
 class LogOutletSettings(ez.Settings):
     log_file_name: Path
     logger: logging.Logger
+    log_format: str = "csv"
 
 
 class LogOutletState(ez.State):
-    file: Any
+    writer: BackgroundLogWriter
 
 
 class LogOutletUnit(ez.Unit):
@@ -22,31 +31,44 @@ class LogOutletUnit(ez.Unit):
     INPUT = ez.InputStream(Any)
 
     def initialize(self) -> None:
-        self.STATE.file = open(self.SETTINGS.log_file_name, "w")
-        self.STATE.file.write(
-            ",".join(
-                [
-                    "t_gen_outlet",
-                    "x\n",
-                ]
-            )
+        self.STATE.writer = create_log_writer(
+            self.SETTINGS.log_format,
+            self.SETTINGS.log_file_name,
+            OUTLET_COLUMNS,
+            logger=self.SETTINGS.logger,
         )
 
+    def log_block(self, message: AxisArray | SampleBatch) -> None:
+        counter, timestamps = block_arrays(message)
+        rows = np.column_stack([timestamps, counter])
+
+        if rows[-1, 1] == -1:
+            self.STATE.writer.write_rows(rows[:-1])
+            self.SETTINGS.logger.info("closing outlet and writing logs to disk...")
+            self.STATE.writer.close()
+
+            raise ez.Complete
+
+        self.STATE.writer.write_rows(rows)
+
     @ez.subscriber(INPUT)
-    async def on_message(self, message: Message) -> None:
+    async def on_message(self, message: Message | AxisArray | SampleBatch) -> None:
+        if isinstance(message, (AxisArray, SampleBatch)):
+            self.log_block(message)
+            return
+
         sample, timestamp = message.sample, message.timestamp
 
         self.SETTINGS.logger.debug((timestamp, sample))
 
         if sample == -1:
             self.SETTINGS.logger.info("closing outlet and writing logs to disk...")
-            self.STATE.file.flush()
-            self.STATE.file.close()
+            self.STATE.writer.close()
 
             raise ez.Complete
 
         else:
-            self.STATE.file.write(f"{timestamp},{sample}\n")
+            self.STATE.writer.write_row(timestamp, sample)
 
 
 # ==================================================================
@@ -56,38 +78,34 @@ class LogInletSettings(ez.Settings):
     window_size: int
     log_file_name: Path
     logger: logging.Logger
+    log_format: str = "csv"
 
 
 class LogInletState(ez.State):
-    file: Any
+    writer: BackgroundLogWriter
 
 
 class LogInletUnit(ez.Unit):
     STATE = LogInletState
     SETTINGS = LogInletSettings
-    INPUT = ez.InputStream(str)
+    INPUT = ez.InputStream(np.ndarray)
 
     def initialize(self) -> None:
-        self.STATE.file = open(self.SETTINGS.log_file_name, "w")
-
-        self.STATE.file.write(
-            ",".join(
-                [
-                    "t_gen_outlet",
-                    "t_lsl_offset",
-                    "t_arr_inlet",
-                    "x\n",
-                ]
-            )
+        self.STATE.writer = create_log_writer(
+            self.SETTINGS.log_format,
+            self.SETTINGS.log_file_name,
+            INLET_COLUMNS,
+            window_size=self.SETTINGS.window_size,
+            logger=self.SETTINGS.logger,
         )
 
     @ez.subscriber(INPUT)
-    async def on_message(self, message: str) -> None:
-        if message == "-1.0":
+    async def on_message(self, message: np.ndarray) -> None:
+        # an empty block is sent after the last window to close the log
+        if len(message) == 0:
             self.SETTINGS.logger.info("closing inlet and writing logs to disk...")
-            self.STATE.file.flush()
-            self.STATE.file.close()
+            self.STATE.writer.close()
 
             raise ez.Complete
         else:
-            self.STATE.file.write(message)
+            self.STATE.writer.write_rows(message)
@@ -1,21 +1,35 @@
+import asyncio
 import logging
+import threading
 from typing import Any
-from collections import deque
+from pathlib import Path
 from collections.abc import AsyncGenerator
 
+import numpy as np
 import pylsl
 import ezmsg.core as ez
+from ezmsg.util.messages.axisarray import AxisArray
 
-from lsl_comp.ez_utils.message import Message
+from lsl_comp.ez_utils.message import Message, SampleBatch, block_arrays
+from lsl_comp.utils.barrier import open_inlet, wait_for_consumer
+from lsl_comp.utils.clocksync import ClockSync, processing_flags
+from lsl_comp.utils.logwriter import INLET_COLUMNS
+from lsl_comp.utils.runstats import write_run_stats
+from lsl_comp.utils.window import WindowBuffer
 
 
 class LSLOutletSettings(ez.Settings):
     fs: int
     stream_name: str
+    channels: int = 1
+    # largest block pushed at once, blocks are pushed as one chunk
+    chunk: int = 1
 
 
 class LSLOutletState(ez.State):
     outlet: Any
+    sample: list[float]
+    block: np.ndarray
 
 
 class LSLOutletUnit(ez.Unit):
@@ -23,21 +37,71 @@ class LSLOutletUnit(ez.Unit):
     SETTINGS = LSLOutletSettings
 
     INPUT = ez.InputStream(Any)
+    # seconds until the inlet subscribed (nan on timeout), the source waits for it
+    OUTPUT_READY = ez.OutputStream(float)
 
     def initialize(self) -> None:
         info = pylsl.StreamInfo(
             name=self.SETTINGS.stream_name,
             type=self.SETTINGS.stream_name,
-            channel_count=1,
+            channel_count=self.SETTINGS.channels,
             nominal_srate=self.SETTINGS.fs,
+            source_id=self.SETTINGS.stream_name,
         )
 
         self.STATE.outlet = pylsl.StreamOutlet(info=info, chunk_size=0)
+        # preallocated payload, channels a source does not send stay zero
+        self.STATE.sample = [0.0] * self.SETTINGS.channels
+        self.STATE.block = np.zeros(
+            (self.SETTINGS.chunk, self.SETTINGS.channels), dtype=np.float32
+        )
+
+    @ez.publisher(OUTPUT_READY)
+    async def ready(self) -> AsyncGenerator:
+        connection_setup_time = await asyncio.to_thread(
+            wait_for_consumer, self.STATE.outlet
+        )
+        yield (
+            self.OUTPUT_READY,
+            float("nan") if connection_setup_time is None else connection_setup_time,
+        )
+
+    def push_block(self, message: AxisArray | SampleBatch) -> None:
+        counter, timestamps = block_arrays(message)
+        n = len(counter)
+
+        # a tick can release more than `chunk` samples after a late wake-up
+        if n > len(self.STATE.block):
+            self.STATE.block = np.zeros((n, self.SETTINGS.channels), dtype=np.float32)
+
+        if isinstance(message, SampleBatch):
+            self.STATE.block[:n, 0] = counter
+        else:
+            # every forwarded channel, sources with fewer channels (the counter
+            # only) leave the remaining ones zero
+            n_channels = message.data.shape[1]
+            if n_channels > self.SETTINGS.channels:
+                raise ValueError(
+                    f"Block has {n_channels} channels, "
+                    f"the outlet {self.SETTINGS.channels}."
+                )
+            self.STATE.block[:n, :n_channels] = message.data[:n]
+            self.STATE.block[:n, n_channels:] = 0.0
+
+        self.STATE.outlet.push_chunk(self.STATE.block[:n], timestamps.tolist())
+
+        if counter[-1] == -1:
+            raise ez.Complete
 
     @ez.subscriber(INPUT)
-    async def outlet(self, message: Message) -> None:
+    async def outlet(self, message: Message | AxisArray | SampleBatch) -> None:
+        if isinstance(message, (AxisArray, SampleBatch)):
+            self.push_block(message)
+            return
+
         sample, timestamp = message.sample, message.timestamp
-        self.STATE.outlet.push_sample([sample], timestamp)
+        self.STATE.sample[0] = sample
+        self.STATE.outlet.push_sample(self.STATE.sample, timestamp)
 
         if sample == -1:
             raise ez.Complete
@@ -49,26 +113,149 @@ class LSLInletSettings(ez.Settings):
     window_size: int
     stream_name: str
     logger: logging.Logger
+    # connection setup time is written next to this log file when given
+    log_file_name: Path | None = None
+    clocksync: str = "sample"
+    clocksync_interval: float = 1.0
+    # "blocking" pulls in the event loop, "thread" pulls on a reader thread
+    pull_mode: str = "blocking"
+
+
+# seconds a reader thread pull waits before it checks for shutdown
+PULL_TIMEOUT = 0.1
 
 
 class LSLInletState(ez.State):
     inlet: Any
-    buffer: deque
+    clock_sync: ClockSync
+    connection_setup_time: float
+    buffer: WindowBuffer
+    window_id: int
+    reader: threading.Thread | None
+    stop_event: threading.Event
 
 
 class LSLInletUnit(ez.Unit):
     STATE = LSLInletState
     SETTINGS = LSLInletSettings
 
-    OUTPUT = ez.OutputStream(str)
+    OUTPUT = ez.OutputStream(np.ndarray)
 
     def initialize(self) -> None:
-        streams = pylsl.resolve_byprop("name", self.SETTINGS.stream_name)
-        self.STATE.inlet = pylsl.StreamInlet(streams[0], max_buflen=1)
-        self.STATE.buffer = deque(maxlen=self.SETTINGS.window_size)
+        self.STATE.inlet, self.STATE.connection_setup_time = open_inlet(
+            self.SETTINGS.stream_name,
+            processing_flags=processing_flags(self.SETTINGS.clocksync),
+        )
+        self.STATE.clock_sync = ClockSync(
+            self.STATE.inlet,
+            self.SETTINGS.clocksync,
+            interval=self.SETTINGS.clocksync_interval,
+        )
+        self.STATE.buffer = WindowBuffer(self.SETTINGS.window_size)
+        self.STATE.window_id = 0
+        self.STATE.reader = None
+        self.STATE.stop_event = threading.Event()
+
+    async def shutdown(self) -> None:
+        self.STATE.stop_event.set()
+        if self.STATE.reader is not None:
+            self.STATE.reader.join(timeout=1.0)
+
+    def final_blocks(self) -> list[np.ndarray]:
+        # last remaining window and the empty block that stops downstream units
+        blocks = []
+
+        if len(self.STATE.buffer) > 0:
+            self.SETTINGS.logger.debug("log the last remaining buffer...")
+            self.SETTINGS.logger.debug(len(self.STATE.buffer))
+            blocks.append(self.STATE.buffer.flush())
+
+        blocks.append(np.empty((0, len(INLET_COLUMNS))))
+
+        if self.SETTINGS.log_file_name is not None:
+            write_run_stats(
+                self.SETTINGS.log_file_name,
+                {
+                    "connection_setup_time": self.STATE.connection_setup_time,
+                    **self.STATE.clock_sync.summary(),
+                },
+            )
+
+        self.STATE.inlet.close_stream()
+        return blocks
+
+    def read_samples(
+        self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue
+    ) -> None:
+        # reader thread, every pull drains the samples already waiting in the
+        # inlet and hands them to the event loop as one (n, 4) batch
+        inlet = self.STATE.inlet
+
+        while not self.STATE.stop_event.is_set():
+            sample, t_generation = inlet.pull_sample(timeout=PULL_TIMEOUT)
+            batch = []
+
+            while t_generation is not None:
+                t_arrival = pylsl.local_clock()
+                t_offset = self.STATE.clock_sync.offset(t_arrival)
+                batch.append((t_generation, t_offset, t_arrival, sample[0]))
+
+                # -1 sent after the last sample to gracefully close stream
+                if sample[0] == -1:
+                    break
+
+                sample, t_generation = inlet.pull_sample(timeout=0.0)
+
+            if len(batch) > 0:
+                loop.call_soon_threadsafe(queue.put_nowait, np.array(batch))
+
+                if batch[-1][3] == -1:
+                    return
+
+    async def pull_threaded(self) -> AsyncGenerator:
+        queue = asyncio.Queue()
+        self.STATE.reader = threading.Thread(
+            target=self.read_samples,
+            args=(asyncio.get_running_loop(), queue),
+            daemon=True,
+        )
+        self.STATE.reader.start()
+
+        while True:
+            block = await queue.get()
+
+            is_done = block[-1, 3] == -1
+            if is_done:
+                block = block[:-1]
+
+            if self.SETTINGS.window_size == 1 and len(block) > 0:
+                rows = np.empty((len(block), len(INLET_COLUMNS)))
+                rows[:, 0] = np.arange(
+                    self.STATE.window_id, self.STATE.window_id + len(block)
+                )
+                rows[:, 1:] = block
+                self.STATE.window_id += len(block)
+
+                yield (self.OUTPUT, rows)
+
+            elif self.SETTINGS.window_size > 1:
+                for rows in self.STATE.buffer.extend(block):
+                    yield (self.OUTPUT, rows)
+
+            if is_done:
+                for rows in self.final_blocks():
+                    yield (self.OUTPUT, rows)
+                return
 
     @ez.publisher(OUTPUT)
     async def inlet(self) -> AsyncGenerator:
+        if self.SETTINGS.pull_mode == "thread":
+            async for message in self.pull_threaded():
+                yield message
+            raise ez.Complete
+
+        buffer = self.STATE.buffer
+
         while True:
             sample, t_generation = self.STATE.inlet.pull_sample()
 
@@ -77,60 +264,37 @@ class LSLInletUnit(ez.Unit):
 
                 # -1 sent after the last sample to gracefully close stream
                 if sample == -1:
-                    # write last remaining buffer to disk
-                    if len(self.STATE.buffer) > 0:
-                        self.SETTINGS.logger.debug("log the last remaining buffer...")
-                        self.SETTINGS.logger.debug(
-                            (
-                                t_generation,
-                                len(self.STATE.buffer),
-                                f"{self.STATE.buffer[0][-1]}...{self.STATE.buffer[-1][-1]}",
-                            )
-                        )
-
-                        log_line = [
-                            ";".join((str(e) for e in b))
-                            for b in list(zip(*self.STATE.buffer))
-                        ]
-                        log_line = ",".join(log_line) + "\n"
+                    # write last remaining buffer to disk and stop downstream
+                    for rows in self.final_blocks():
+                        yield (self.OUTPUT, rows)
 
-                        yield (self.OUTPUT, log_line)
-
-                    # send the last -1 to stop downstream units
-                    yield (self.OUTPUT, str(sample))
-
-                    self.STATE.inlet.close_stream()
                     raise ez.Complete
 
                 else:
                     t_arrival = pylsl.local_clock()
-                    t_offset = self.STATE.inlet.time_correction()
+                    t_offset = self.STATE.clock_sync.offset(t_arrival)
 
                     if self.SETTINGS.window_size == 1:
                         self.SETTINGS.logger.debug((t_generation, sample))
-                        log_line = f"{t_generation},{t_offset},{t_arrival},{sample}\n"
-
-                        yield (self.OUTPUT, log_line)
-
-                    else:
-                        self.STATE.buffer.append(
-                            (t_generation, t_offset, t_arrival, sample)
+                        rows = np.array(
+                            [
+                                [
+                                    self.STATE.window_id,
+                                    t_generation,
+                                    t_offset,
+                                    t_arrival,
+                                    sample,
+                                ]
+                            ]
                         )
+                        self.STATE.window_id += 1
 
-                        if len(self.STATE.buffer) == self.SETTINGS.window_size:
-                            log_line = [
-                                ";".join((str(e) for e in b))
-                                for b in list(zip(*self.STATE.buffer))
-                            ]
-                            log_line = ",".join(log_line) + "\n"
+                        yield (self.OUTPUT, rows)
 
-                            yield (self.OUTPUT, log_line)
+                    else:
+                        buffer.append(t_generation, t_offset, t_arrival, sample)
 
-                            self.SETTINGS.logger.debug(
-                                (
-                                    t_generation,
-                                    len(self.STATE.buffer),
-                                    f"{self.STATE.buffer[0][-1]}...{self.STATE.buffer[-1][-1]}",
-                                )
-                            )
-                            self.STATE.buffer.clear()
+                        # flush() hands out a new block, the buffer is reused
+                        if buffer.is_full():
+                            self.SETTINGS.logger.debug((t_generation, len(buffer)))
+                            yield (self.OUTPUT, buffer.flush())
@@ -1,18 +1,46 @@
+import time
+import asyncio
+from typing import Any
 from collections.abc import AsyncGenerator
 
+import numpy as np
 import pylsl
 import ezmsg.core as ez
-from ezmsg.util.messages.axisarray import AxisArray
+from ezmsg.util.messages.axisarray import AxisArray, replace
 
-from lsl_comp.ez_utils.message import Message
+from lsl_comp.ez_utils.message import SampleBatch
+
+# the nsp sends int16 samples, a counter in the counter channel wraps at 2**16
+COUNTER_CHANNEL = 1
+COUNTER_MODULUS = 1 << 16
+
+# seconds the end block gets to reach the outlet and the log before the
+# pipeline is stopped, NSPSource streams forever and never completes
+STOP_GRACE = 2.0
+
+
+def channel_subset(channels: int) -> tuple[int, ...]:
+    # the counter channel first, then the lowest other channels
+    others = [ch for ch in range(channels) if ch != COUNTER_CHANNEL]
+    return (COUNTER_CHANNEL, *others[: channels - 1])
 
 
 class NSPExtractorSettings(ez.Settings):
+    # total count in samples
     tc: int
+    # nsp channel indices forwarded, the first one holds the counter
+    channels: tuple[int, ...] = (COUNTER_CHANNEL,)
+    # message type of a block, "axisarray" or "batch" (SampleBatch, counter only)
+    block_type: str = "axisarray"
 
 
 class NSPExtractorState(ez.State):
     current_count: int
+    # lsl clock minus time.time(), NSPSource stamps blocks in system time
+    clock_offset: float
+    # last raw and unwrapped counter value, None before the first block
+    last_raw: int | None
+    last_count: int
 
 
 class NSPExtractorUnit(ez.Unit):
@@ -20,24 +48,67 @@ class NSPExtractorUnit(ez.Unit):
     STATE = NSPExtractorState
 
     INPUT = ez.InputStream(AxisArray)
-    OUTPUT = ez.OutputStream(Message)
+    # one AxisArray (time x channels) or SampleBatch per nsp block
+    OUTPUT = ez.OutputStream(Any)
 
     def initialize(self) -> None:
         self.STATE.current_count = 0
+        self.STATE.clock_offset = pylsl.local_clock() - time.time()
+        self.STATE.last_raw = None
+        self.STATE.last_count = 0
+
+    def unwrap_counter(self, raw: np.ndarray) -> np.ndarray:
+        # steps modulo 2**16 keep counting across wraps and gaps shorter
+        # than the modulus
+        raw = np.rint(raw).astype(np.int64)
+
+        if self.STATE.last_raw is None:
+            self.STATE.last_raw = raw[0]
+            self.STATE.last_count = raw[0] % COUNTER_MODULUS
+
+        steps = np.diff(raw, prepend=self.STATE.last_raw) % COUNTER_MODULUS
+        counter = self.STATE.last_count + np.cumsum(steps)
+
+        self.STATE.last_raw = raw[-1]
+        self.STATE.last_count = counter[-1]
+        return counter
+
+    def block(
+        self, data: np.ndarray, offset: float, template: AxisArray
+    ) -> AxisArray | SampleBatch:
+        time_axis = template.axes["time"]
+
+        if self.SETTINGS.block_type == "batch":
+            return SampleBatch.from_arrays(
+                data[:, 0], offset + time_axis.gain * np.arange(len(data))
+            )
+
+        axes = {**template.axes, "time": replace(time_axis, offset=offset)}
+        if "ch" in template.axes:
+            ch_axis = template.axes["ch"]
+            labels = np.take(ch_axis.data, self.SETTINGS.channels)
+            axes["ch"] = replace(ch_axis, data=labels)
+
+        return replace(template, data=data, axes=axes)
 
     @ez.subscriber(INPUT)
     @ez.publisher(OUTPUT)
     async def extract(self, message: AxisArray) -> AsyncGenerator:
+        n = min(message.data.shape[0], self.SETTINGS.tc - self.STATE.current_count)
+
+        if n > 0:
+            # take copies, the counter column is overwritten below
+            data = np.take(message.data[:n], self.SETTINGS.channels, axis=1)
+            data = data.astype(np.float64, copy=False)
+            data[:, 0] = self.unwrap_counter(data[:, 0])
+
+            offset = message.axes["time"].offset + self.STATE.clock_offset
+            yield (self.OUTPUT, self.block(data, offset, message))
+            self.STATE.current_count += n
+
         if self.STATE.current_count >= self.SETTINGS.tc:
-            yield (
-                self.OUTPUT,
-                Message(sample=-1, timestamp=pylsl.local_clock()),
-            )
-            raise ez.Complete
-        else:
-            sample = message.data[:, 1].item()
-            yield (
-                self.OUTPUT,
-                Message(sample=sample, timestamp=pylsl.local_clock()),
-            )
-            self.STATE.current_count += 1
+            data = np.full((1, len(self.SETTINGS.channels)), -1.0)
+            yield (self.OUTPUT, self.block(data, pylsl.local_clock(), message))
+
+            await asyncio.sleep(STOP_GRACE)
+            raise ez.NormalTermination
@@ -1,50 +1,269 @@
-import time
-import platform
+import functools
 import itertools
-import subprocess
-import multiprocessing
+from collections.abc import Iterable, Iterator
 from pathlib import Path
-from typing import NamedTuple
 
 import click
 
 from lsl_comp.utils.pylogger import logger_creator
+from lsl_comp.utils.logwriter import LOG_FORMATS
+from lsl_comp.telemetry import TELEMETRY_DIR
+from lsl_comp.sweep import (
+    DEFAULT_SWEEP,
+    SWEEP_DIR,
+    Combo,
+    Sweep,
+    find_sweep,
+    iter_combos,
+    load_sweep,
+)
+from lsl_comp.analyse import analyse_run
+from lsl_comp.capacity import (
+    CAPACITY_ID_BASE,
+    archive_run,
+    is_sustained,
+    run_log_files,
+    search_max_fs,
+    write_capacity_curve,
+)
+from lsl_comp.scheduler import (
+    Run,
+    Scheduler,
+    graph_ports,
+    max_jobs,
+    nsp_ports,
+    session_token,
+    socket_port,
+    stream_name,
+)
 
 logger = logger_creator(verbose=True)
 
+# xlets write their logs relative to the working directory
+LOG_DIR = Path("./logs")
+
 outlet_to_script = {
     "ezmsg_pylsl": Path("./src/lsl_comp/xlets/ezmsgpylsl_outlet.py"),
     "pylsl": Path("./src/lsl_comp/xlets/pylsl_outlet.py"),
+    "shm": Path("./src/lsl_comp/xlets/shm_outlet.py"),
+    "socket_udp": Path("./src/lsl_comp/xlets/socket_outlet.py"),
+    "socket_tcp": Path("./src/lsl_comp/xlets/socket_outlet.py"),
 }
 inlet_to_script = {
     "ezmsg_pylsl": Path("./src/lsl_comp/xlets/ezmsgpylsl_inlet.py"),
+    "ezmsg_pylsl_thread": Path("./src/lsl_comp/xlets/ezmsgpylsl_inlet.py"),
     "pylsl": Path("./src/lsl_comp/xlets/pylsl_inlet.py"),
+    "shm": Path("./src/lsl_comp/xlets/shm_inlet.py"),
+    "socket_udp": Path("./src/lsl_comp/xlets/socket_inlet.py"),
+    "socket_tcp": Path("./src/lsl_comp/xlets/socket_inlet.py"),
+}
+# variants of a script selected by extra options
+outlet_extra_args = {
+    "socket_udp": ["--protocol", "udp"],
+    "socket_tcp": ["--protocol", "tcp"],
+}
+inlet_extra_args = {
+    "ezmsg_pylsl_thread": ["--pull-mode", "thread"],
+    "socket_udp": ["--protocol", "udp"],
+    "socket_tcp": ["--protocol", "tcp"],
 }
 
+# xlets running an ezmsg pipeline, they get a dedicated graph server per run
+ezmsg_xlets = ["ezmsg_pylsl", "ezmsg_pylsl_thread"]
 
-def run_script(script_name: str, args: list[str]):
-    try:
-        if platform.system() == "Windows":
-            _ = subprocess.run(
-                ["python", script_name] + args,
-                check=True,
-                executable=r".venv\Scripts\python.exe",
+# lower-bound references without lsl, each only pairs with itself
+baseline_xlets = ["shm", "socket_udp", "socket_tcp"]
+socket_xlets = ["socket_udp", "socket_tcp"]
+
+
+def is_supported(c: Combo) -> bool:
+    # baselines only talk to themselves
+    if (
+        c.outlet in baseline_xlets or c.inlet in baseline_xlets
+    ) and c.outlet != c.inlet:
+        return False
+
+    # chunked pulls are only implemented by the pure pylsl and baseline inlets
+    return c.chunk == 1 or c.inlet in ["pylsl", *baseline_xlets]
+
+
+def make_run(
+    i: int,
+    c: Combo,
+    session: str,
+    log_format: str,
+    timeout_margin: float,
+    nsp_sim: bool = False,
+) -> Run:
+    log_file_outlet = outlet_to_script[c.outlet]
+    log_file_inlet = inlet_to_script[c.inlet]
+    dt = c.datatype
+    tc = c.total_count
+    fs = c.fs
+    mp = c.multiproc
+    ws = c.window_size
+    ch = c.chunk
+    nch = c.channels
+    cs = c.clocksync
+    sn = stream_name(dt, session, i)
+
+    logger.debug((c.outlet, log_file_outlet))
+    logger.debug((c.inlet, log_file_inlet))
+
+    outlet_args = f"--tc {tc} --fs {fs} --mp {mp} --ws {ws} --chunk {ch} --channels {nch} --clocksync {cs} --datatype {dt} --platform {c.platform} --log-format {log_format} --stream-name {sn} --verbose False --id {i}".split(
+        " "
+    )
+    inlet_args = f"--fs {fs} --mp {mp} --ws {ws} --chunk {ch} --channels {nch} --clocksync {cs} --datatype {dt} --platform {c.platform} --log-format {log_format} --stream-name {sn} --verbose False --id {i}".split(
+        " "
+    )
+
+    outlet_args += outlet_extra_args.get(c.outlet, [])
+    inlet_args += inlet_extra_args.get(c.inlet, [])
+
+    outlet_port, inlet_port = graph_ports(i)
+    if c.outlet in ezmsg_xlets:
+        outlet_args += ["--graph-port", str(outlet_port)]
+    if c.inlet in ezmsg_xlets:
+        inlet_args += ["--graph-port", str(inlet_port)]
+    if c.inlet in socket_xlets:
+        outlet_args += ["--port", str(socket_port(i))]
+        inlet_args += ["--port", str(socket_port(i))]
+    if nsp_sim and dt == "airsignal":
+        nsp_port, client_port = nsp_ports(i)
+        outlet_args += ["--nsp-sim", "--nsp-port", str(nsp_port)]
+        outlet_args += ["--client-port", str(client_port)]
+
+    return Run(
+        id=i,
+        outlet_script=log_file_outlet,
+        outlet_args=outlet_args,
+        inlet_script=log_file_inlet,
+        inlet_args=inlet_args,
+        timeout=tc / fs + timeout_margin,
+    )
+
+
+def probe_capacity(
+    fs: int,
+    *,
+    base: Combo,
+    channels: int,
+    results: dict[int, dict | None],
+    probe_ids: Iterator[int],
+    spec: Sweep,
+    scheduler: Scheduler,
+    session: str,
+    log_format: str,
+    max_p99: float,
+    nsp_sim: bool,
+) -> bool:
+    # one probe run of a combo at fs, its analysis is kept in results
+    c = base._replace(
+        fs=fs,
+        channels=channels,
+        total_count=max(1, round(fs * spec.capacity["probe_seconds"])),
+    )
+    run = make_run(
+        next(probe_ids),
+        c,
+        session,
+        log_format,
+        spec.limits["run_timeout_margin"],
+        nsp_sim,
+    )
+    failed = scheduler.run_all([run])
+
+    logfiles = run_log_files(LOG_DIR, run.id)
+    results[fs] = (
+        analyse_run(logfiles) if run.id not in failed and len(logfiles) == 2 else None
+    )
+    archive_run(LOG_DIR, run.id)
+
+    is_ok = is_sustained(results[fs], max_p99)
+    logger.info(
+        f"capacity {c.outlet} -> {c.inlet}, {channels} channels at {fs} Hz: {'pass' if is_ok else 'fail'}"
+    )
+    return is_ok
+
+
+def run_capacity(
+    spec: Sweep,
+    combos: Iterable[tuple[int, Combo]],
+    scheduler: Scheduler,
+    session: str,
+    log_format: str,
+    max_p99: float,
+    nsp_sim: bool,
+) -> None:
+    # highest sustainable fs of every combo for each channel count, probed
+    # with the regular xlets and judged by the regular analyse metrics
+    options = spec.capacity
+    rows = []
+
+    for i, base in combos:
+        probe_ids = itertools.count(CAPACITY_ID_BASE + i * 1_000)
+
+        for channels in options["channels"]:
+            results: dict[int, dict | None] = {}
+            passes = functools.partial(
+                probe_capacity,
+                base=base,
+                channels=channels,
+                results=results,
+                probe_ids=probe_ids,
+                spec=spec,
+                scheduler=scheduler,
+                session=session,
+                log_format=log_format,
+                max_p99=max_p99,
+                nsp_sim=nsp_sim,
+            )
+
+            max_fs = search_max_fs(
+                passes, options["fs_min"], options["fs_max"], options["tolerance"]
+            )
+            result = results.get(max_fs) if max_fs is not None else None
+
+            rows.append(
+                {
+                    "platform": base.platform,
+                    "datatype": base.datatype,
+                    "outlet": base.outlet,
+                    "inlet": base.inlet,
+                    "multiproc": base.multiproc,
+                    "window_size": base.window_size,
+                    "chunk": base.chunk,
+                    "clocksync": base.clocksync,
+                    "channels": channels,
+                    "max_fs": max_fs,
+                    "latency_p99": result["latency_p99"] if result else None,
+                    "max_p99": max_p99,
+                    "n_probes": len(results),
+                }
             )
-        else:
-            _ = subprocess.run(["python", script_name] + args, check=True)
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error occurred while running {script_name}: {e}")
 
+    if rows:
+        file_name = write_capacity_curve(LOG_DIR, rows[0]["platform"], rows)
+        logger.info(f"capacity curve written to {file_name}")
 
-class Combo(NamedTuple):
-    platform: str
-    datatype: str
-    outlet: str
-    inlet: str
-    total_count: int
-    fs: int
-    multiproc: bool
-    window_size: int
+
+def parse_shard(ctx, param, value: str | None) -> tuple[int, int | None]:
+    # "start:stop" range of combo indices, either end may be left out
+    if value is None:
+        return 0, None
+
+    try:
+        start, stop = value.split(":")
+        return int(start or 0), int(stop) if stop else None
+    except ValueError:
+        raise click.BadParameter("expected START:STOP, e.g. 0:100") from None
+
+
+def parse_sweep(ctx, param, value: Path) -> Path:
+    path = find_sweep(value)
+    if path is None:
+        raise click.BadParameter(f"no sweep spec {value} here or in {SWEEP_DIR}")
+    return path
 
 
 @click.command()
@@ -54,81 +273,137 @@ class Combo(NamedTuple):
 @click.option(
     "--datatype", type=click.STRING, help="counter, airsignal.", required=True
 )
-def main(platform: str, datatype: str) -> None:
-    # different configurations
-    outlets = ["ezmsg_pylsl", "pylsl"]
-    inlets = ["ezmsg_pylsl", "pylsl"]
-    total_count = [3_000]
-    sampling_rate = [1000]
-    multiproc = [True, False]
-    window_size = [1, 60, 100]
-
-    # create combos from above list
-    combos = list(
-        itertools.product(
-            [platform],
-            [datatype],
-            outlets,
-            inlets,
-            total_count,
-            sampling_rate,
-            multiproc,
-            window_size,
-        )
+@click.option(
+    "--sweep",
+    type=click.Path(dir_okay=False, path_type=Path),
+    callback=parse_sweep,
+    help="TOML sweep spec, a path or the name of a spec in lsl_comp/sweeps (default: default.toml).",
+    default=DEFAULT_SWEEP,
+)
+@click.option(
+    "--shard",
+    type=click.STRING,
+    callback=parse_shard,
+    help="START:STOP range of combo indices run on this machine.",
+    default=None,
+)
+@click.option(
+    "--log-format",
+    type=click.Choice(list(LOG_FORMATS)),
+    help="Log file format of all xlets.",
+    default="csv",
+)
+@click.option(
+    "--jobs",
+    type=click.INT,
+    help=f"Combos run concurrently (at most {max_jobs()} on this machine, default: sweep limit).",
+    default=None,
+)
+@click.option(
+    "--pin/--no-pin",
+    help="Pin concurrent runs to disjoint sets of cores (default: sweep limit).",
+    default=None,
+)
+@click.option(
+    "--capacity",
+    is_flag=True,
+    help="Search the highest sustainable fs of every combo instead of running the grid.",
+    default=False,
+)
+@click.option(
+    "--max-p99",
+    type=click.FLOAT,
+    help="p99 latency bound (s) of --capacity (default: sweep capacity.max_p99).",
+    default=None,
+)
+@click.option(
+    "--telemetry/--no-telemetry",
+    help=f"Sample cpu, memory and scheduling of every run into logs/{TELEMETRY_DIR}.",
+    default=True,
+)
+@click.option(
+    "--nsp-sim",
+    is_flag=True,
+    help="Feed airsignal runs from a simulated nsp on loopback instead of the device.",
+    default=False,
+)
+def main(
+    platform: str,
+    datatype: str,
+    sweep: Path,
+    shard: tuple[int, int | None],
+    log_format: str,
+    jobs: int | None,
+    pin: bool | None,
+    capacity: bool,
+    max_p99: float | None,
+    telemetry: bool,
+    nsp_sim: bool,
+) -> None:
+    spec = load_sweep(sweep)
+    jobs = spec.limits["jobs"] if jobs is None else jobs
+    pin = spec.limits["pin"] if pin is None else pin
+
+    # combos are numbered over the whole sweep, so shards run on different
+    # machines get distinct run ids, stream names and ports
+    def valid_combos() -> Iterator[tuple[int, Combo]]:
+        combos = iter_combos(spec, platform, datatype)
+        return enumerate(c for c in combos if is_supported(c))
+
+    n_combos = sum(1 for _ in valid_combos())
+    start, stop = shard
+    stop = n_combos if stop is None else min(stop, n_combos)
+    logger.info(f"\nValid combos = {n_combos}, running {start}:{stop}\n")
+
+    # the nsp client port can only be bound by one run at a time, simulated
+    # nsps get ports of their own per run
+    if datatype == "airsignal" and jobs > 1 and not nsp_sim:
+        logger.warning("airsignal runs share the nsp, running one combo at a time")
+        jobs = 1
+
+    session = session_token()
+
+    def make_runs() -> Iterator[Run]:
+        for i, c in itertools.islice(valid_combos(), start, stop):
+            logger.debug("=" * 50)
+            logger.debug(("\n", i, c, "\n"))
+            yield make_run(
+                i,
+                c,
+                session,
+                log_format,
+                spec.limits["run_timeout_margin"],
+                nsp_sim,
+            )
+
+    scheduler = Scheduler(
+        jobs, pin, logger, telemetry_logdir=LOG_DIR if telemetry else None
     )
 
-    logger.info(f"\nTotal combos = {len(combos)}\n")
-    combos = [Combo(*c) for c in combos]
-
-    # ignore multiprocessing where either the inlet or outlet is pure pylsl
-    combos = [
-        c
-        for c in combos
-        if not ((c.outlet == "pylsl" or c.inlet == "pylsl") and c.multiproc)
-    ]
-    logger.info(f"\nValid combos = {len(combos)}\n")
-
-    for i, c in enumerate(combos):
-        logger.debug("=" * 50)
-        logger.debug(("\n", i, c, "\n"))
-
-        log_file_outlet = outlet_to_script[c.outlet]
-        log_file_inlet = inlet_to_script[c.inlet]
-        dt = c.datatype
-        tc = c.total_count
-        fs = c.fs
-        mp = c.multiproc
-        ws = c.window_size
-
-        logger.debug((c.outlet, log_file_outlet))
-        logger.debug((c.inlet, log_file_inlet))
-
-        process_outlet = multiprocessing.Process(
-            target=run_script,
-            args=(
-                log_file_outlet,
-                f"--tc {tc} --fs {fs} --mp {mp} --ws {ws} --datatype {dt} --platform {platform} --verbose False --id {i}".split(
-                    " "
-                ),
-            ),
-        )
-        process_inlet = multiprocessing.Process(
-            target=run_script,
-            args=(
-                log_file_inlet,
-                f"--fs {fs} --mp {mp} --ws {ws} --datatype {dt} --platform {platform} --verbose False --id {i}".split(
-                    " "
-                ),
-            ),
-        )
+    if capacity:
+        # fs, channels and total count are searched, the other axes define
+        # the combos. each combo keeps the index of its first grid entry.
+        base_combos = {}
+        for i, c in itertools.islice(valid_combos(), start, stop):
+            base_combos.setdefault(
+                c._replace(fs=0, channels=0, total_count=0, repetition=0), (i, c)
+            )
 
-        process_outlet.start()
-        process_inlet.start()
+        run_capacity(
+            spec,
+            base_combos.values(),
+            scheduler,
+            session,
+            log_format,
+            spec.capacity["max_p99"] if max_p99 is None else max_p99,
+            nsp_sim,
+        )
+        return
 
-        process_outlet.join()
-        process_inlet.join()
+    failed = scheduler.run_all(make_runs())
 
-        time.sleep(1)
+    if failed:
+        logger.error(f"{len(failed)} runs failed: {failed}")
 
 
 if __name__ == "__main__":
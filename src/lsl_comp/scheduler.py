@@ -0,0 +1,247 @@
+import os
+import time
+import uuid
+import logging
+import platform
+import subprocess
+from pathlib import Path
+from typing import NamedTuple
+from collections import deque
+from collections.abc import Iterable
+
+from lsl_comp.telemetry import TelemetrySampler, is_supported, telemetry_file_name
+
+# an outlet and an inlet are busy in every run, so a run needs two cores
+CORES_PER_RUN = 2
+
+# ezmsg xlets get a graph server of their own, outlet and inlet one port each
+GRAPH_PORT_BASE = 25_980
+GRAPH_PORT_RANGE = 4_096
+
+# socket xlets send over loopback to a port of their own, below the graph ports
+SOCKET_PORT_BASE = 21_000
+SOCKET_PORT_RANGE = 4_096
+
+# a simulated nsp listens on one port and streams to the next, below the
+# socket ports
+NSP_PORT_BASE = 12_800
+NSP_PORT_RANGE = 2_048
+
+POLL_INTERVAL = 0.05
+
+# seconds the inlet may outlive its outlet before it is considered hung
+INLET_GRACE = 10.0
+
+
+class Run(NamedTuple):
+    id: int
+    outlet_script: Path
+    outlet_args: list[str]
+    inlet_script: Path
+    inlet_args: list[str]
+    timeout: float
+
+
+class ActiveRun:
+    def __init__(
+        self,
+        run: Run,
+        slot: int,
+        outlet: subprocess.Popen,
+        inlet: subprocess.Popen,
+        telemetry: TelemetrySampler | None = None,
+    ) -> None:
+        self.run = run
+        self.slot = slot
+        self.outlet = outlet
+        self.inlet = inlet
+        self.telemetry = telemetry
+        self.start_time = time.monotonic()
+        self.outlet_exit_time: float | None = None
+
+
+def session_token() -> str:
+    # distinguishes the streams of concurrent sweeps on the same network
+    return uuid.uuid4().hex[:8]
+
+
+def stream_name(datatype: str, session: str, run_id: int) -> str:
+    return f"{datatype}-{session}-{run_id}"
+
+
+def graph_ports(run_id: int) -> tuple[int, int]:
+    port = GRAPH_PORT_BASE + 2 * (run_id % GRAPH_PORT_RANGE)
+    return port, port + 1
+
+
+def socket_port(run_id: int) -> int:
+    return SOCKET_PORT_BASE + run_id % SOCKET_PORT_RANGE
+
+
+def nsp_ports(run_id: int) -> tuple[int, int]:
+    port = NSP_PORT_BASE + 2 * (run_id % NSP_PORT_RANGE)
+    return port, port + 1
+
+
+def max_jobs() -> int:
+    n_cores = (
+        len(os.sched_getaffinity(0))
+        if hasattr(os, "sched_getaffinity")
+        else os.cpu_count() or 1
+    )
+    return max(1, n_cores // CORES_PER_RUN)
+
+
+def core_sets(jobs: int) -> list[set[int] | None]:
+    # disjoint cores per slot, so concurrent runs do not preempt each other
+    if not hasattr(os, "sched_setaffinity"):
+        return [None] * jobs
+
+    cores = sorted(os.sched_getaffinity(0))
+    n = len(cores) // jobs
+    return [set(cores[k * n : (k + 1) * n]) for k in range(jobs)]
+
+
+def start_script(
+    script_name: Path, args: list[str], cores: set[int] | None
+) -> subprocess.Popen:
+    if platform.system() == "Windows":
+        return subprocess.Popen(
+            ["python", str(script_name)] + args,
+            executable=r".venv\Scripts\python.exe",
+        )
+
+    process = subprocess.Popen(["python", str(script_name)] + args)
+
+    # pinned from the parent, preexec_fn is unsafe next to the telemetry
+    # threads. the xlet is still starting the interpreter at this point, so
+    # the children it spawns (ezmsg multiproc) inherit the affinity.
+    if cores:
+        try:
+            os.sched_setaffinity(process.pid, cores)
+        except ProcessLookupError:
+            pass
+
+    return process
+
+
+def stop_process(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=5.0)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+class Scheduler:
+    # runs up to `jobs` outlet/inlet pairs at once. a slot is released as
+    # soon as both processes of its run have exited, runs that exceed their
+    # timeout or whose inlet hangs after the outlet finished are terminated.
+    def __init__(
+        self,
+        jobs: int,
+        pin: bool,
+        logger: logging.Logger,
+        telemetry_logdir: Path | None = None,
+    ) -> None:
+        self.logger = logger
+        self.jobs = min(jobs, max_jobs())
+        if self.jobs < jobs:
+            logger.warning(f"limiting {jobs} jobs to {self.jobs} by core count")
+
+        self.cores = core_sets(self.jobs) if pin else [None] * self.jobs
+        if pin and None in self.cores:
+            logger.warning("core pinning is not supported on this platform")
+
+        # resource usage of every run is sampled from /proc where available
+        self.telemetry_logdir = telemetry_logdir
+        if telemetry_logdir is not None and not is_supported():
+            logger.warning("telemetry needs /proc, runs are not sampled")
+            self.telemetry_logdir = None
+
+        self.failed: list[int] = []
+
+    def launch(self, run: Run, slot: int) -> ActiveRun:
+        cores = self.cores[slot]
+
+        # the inlet is started first, it waits in resolve until the outlet exists
+        inlet = start_script(run.inlet_script, run.inlet_args, cores)
+        outlet = start_script(run.outlet_script, run.outlet_args, cores)
+
+        sampler = None
+        if self.telemetry_logdir is not None:
+            sampler = TelemetrySampler(
+                telemetry_file_name(self.telemetry_logdir, run.id),
+                {"outlet": outlet.pid, "inlet": inlet.pid},
+            )
+            sampler.start()
+
+        self.logger.debug(f"run {run.id} started in slot {slot} on cores {cores}")
+        return ActiveRun(run, slot, outlet, inlet, sampler)
+
+    def is_finished(self, active: ActiveRun) -> bool:
+        now = time.monotonic()
+        outlet_code, inlet_code = active.outlet.poll(), active.inlet.poll()
+
+        if outlet_code is not None and active.outlet_exit_time is None:
+            active.outlet_exit_time = now
+
+        if outlet_code is not None and inlet_code is not None:
+            if outlet_code != 0 or inlet_code != 0:
+                self.logger.error(
+                    f"run {active.run.id} exited with outlet {outlet_code}, inlet {inlet_code}"
+                )
+                self.failed.append(active.run.id)
+            return True
+
+        is_hung = (
+            active.outlet_exit_time is not None
+            and now - active.outlet_exit_time > INLET_GRACE
+        )
+        is_timeout = now - active.start_time > active.run.timeout
+
+        if is_hung or is_timeout:
+            reason = "inlet hung after outlet exit" if is_hung else "timeout"
+            self.logger.error(f"run {active.run.id} terminated, {reason}")
+            stop_process(active.outlet)
+            stop_process(active.inlet)
+            self.failed.append(active.run.id)
+            return True
+
+        return False
+
+    def run_all(self, runs: Iterable[Run]) -> list[int]:
+        # runs are pulled one at a time, so they can be generated lazily
+        pending = iter(runs)
+        next_run = next(pending, None)
+        free_slots = deque(range(self.jobs))
+        active_runs: list[ActiveRun] = []
+        n_done = 0
+
+        try:
+            while next_run is not None or active_runs:
+                while next_run is not None and free_slots:
+                    active_runs.append(self.launch(next_run, free_slots.popleft()))
+                    next_run = next(pending, None)
+
+                time.sleep(POLL_INTERVAL)
+
+                for active in [a for a in active_runs if self.is_finished(a)]:
+                    if active.telemetry is not None:
+                        active.telemetry.stop()
+                    active_runs.remove(active)
+                    free_slots.append(active.slot)
+                    n_done += 1
+                    self.logger.info(
+                        f"run {active.run.id} done in {time.monotonic() - active.start_time:.1f} s, {n_done} done"
+                    )
+        finally:
+            for active in active_runs:
+                stop_process(active.outlet)
+                stop_process(active.inlet)
+                if active.telemetry is not None:
+                    active.telemetry.stop()
+
+        return self.failed
@@ -0,0 +1,148 @@
+import itertools
+import tomllib
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, NamedTuple
+
+# sweep spec (toml):
+#   repetitions = 1
+#   [axes]      values of every combo field, the grid is their product
+#   [[exclude]] combos matching all fields of a rule are dropped,
+#               e.g. {outlet = ["pylsl"], multiproc = [true]}
+#   [limits]    resource limits of the machine running the sweep
+#   [capacity]  search range and pass criteria of `experiment --capacity`
+SWEEP_DIR = Path(__file__).parent / "sweeps"
+DEFAULT_SWEEP = SWEEP_DIR / "default.toml"
+
+AXES = [
+    "outlet",
+    "inlet",
+    "total_count",
+    "fs",
+    "multiproc",
+    "window_size",
+    "chunk",
+    "channels",
+    "clocksync",
+]
+
+LIMITS = {
+    # runs executed concurrently when --jobs is not given
+    "jobs": 1,
+    # pin concurrent runs to disjoint cores when --pin is not given
+    "pin": False,
+    # seconds allowed on top of the nominal run duration before a run is killed
+    "run_timeout_margin": 60.0,
+    # combos with a longer nominal duration (total_count / fs) are skipped
+    "max_run_seconds": None,
+    # combos streaming more values per second (fs * channels) are skipped
+    "max_channel_rate": None,
+}
+
+CAPACITY = {
+    # sampling rates the search is bounded by
+    "fs_min": 100,
+    "fs_max": 30_000,
+    # the highest fs is searched for each of these channel counts
+    "channels": [1, 96, 256],
+    # nominal duration of every probe run
+    "probe_seconds": 5.0,
+    # a probe passes with zero loss and a p99 latency below this (seconds)
+    "max_p99": 0.01,
+    # the search stops once the bracket is narrower than this ratio
+    "tolerance": 0.05,
+}
+
+
+class Combo(NamedTuple):
+    platform: str
+    datatype: str
+    outlet: str
+    inlet: str
+    total_count: int
+    fs: int
+    multiproc: bool
+    window_size: int
+    chunk: int
+    channels: int
+    clocksync: str
+    repetition: int
+
+
+class Sweep(NamedTuple):
+    axes: dict[str, list]
+    exclude: list[dict[str, list]]
+    limits: dict[str, Any]
+    repetitions: int
+    capacity: dict[str, Any]
+
+
+def as_list(value: Any) -> list:
+    return value if isinstance(value, list) else [value]
+
+
+def find_sweep(path: Path) -> Path | None:
+    # a path to a spec, or the name of one shipped in lsl_comp/sweeps
+    for candidate in (path, SWEEP_DIR / path):
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def load_sweep(path: Path = DEFAULT_SWEEP) -> Sweep:
+    with open(path, "rb") as f:
+        spec = tomllib.load(f)
+
+    unknown = set(spec) - {"axes", "exclude", "limits", "repetitions", "capacity"}
+    if unknown:
+        raise ValueError(f"Unknown sweep sections {sorted(unknown)} in {path}.")
+
+    axes = {k: as_list(v) for k, v in spec.get("axes", {}).items()}
+    if set(axes) != set(AXES):
+        raise ValueError(f"Sweep {path} must define exactly the axes {AXES}.")
+
+    exclude = [
+        {k: as_list(v) for k, v in rule.items()} for rule in spec.get("exclude", [])
+    ]
+    for rule in exclude:
+        if not set(rule) <= set(AXES):
+            raise ValueError(f"Exclusion rule {rule} uses unknown axes.")
+
+    limits = {**LIMITS, **spec.get("limits", {})}
+    if set(limits) != set(LIMITS):
+        raise ValueError(f"Unknown limits {sorted(set(limits) - set(LIMITS))}.")
+
+    capacity = {**CAPACITY, **spec.get("capacity", {})}
+    if set(capacity) != set(CAPACITY):
+        raise ValueError(
+            f"Unknown capacity options {sorted(set(capacity) - set(CAPACITY))}."
+        )
+    capacity["channels"] = as_list(capacity["channels"])
+
+    return Sweep(axes, exclude, limits, int(spec.get("repetitions", 1)), capacity)
+
+
+def is_excluded(sweep: Sweep, c: Combo) -> bool:
+    if any(
+        all(getattr(c, k) in values for k, values in rule.items())
+        for rule in sweep.exclude
+    ):
+        return True
+
+    max_run_seconds = sweep.limits["max_run_seconds"]
+    if max_run_seconds is not None and c.total_count / c.fs > max_run_seconds:
+        return True
+
+    max_channel_rate = sweep.limits["max_channel_rate"]
+    return max_channel_rate is not None and c.fs * c.channels > max_channel_rate
+
+
+def iter_combos(sweep: Sweep, platform: str, datatype: str) -> Iterator[Combo]:
+    # the product is expanded lazily, combos are never held in memory at once
+    for values in itertools.product(
+        *(sweep.axes[k] for k in AXES), range(sweep.repetitions)
+    ):
+        c = Combo(platform, datatype, *values)
+
+        if not is_excluded(sweep, c):
+            yield c
@@ -0,0 +1,139 @@
+import csv
+import os
+import threading
+import time
+from pathlib import Path
+
+# per-run resource usage of the outlet and inlet processes (and the children
+# they spawn, e.g. ezmsg multiproc), sampled from /proc by the scheduler
+TELEMETRY_DIR = "telemetry"
+TELEMETRY_INTERVAL = 0.1
+
+TELEMETRY_COLUMNS = [
+    "t",
+    "role",
+    "pid",
+    "cpu_time",
+    "cpu_percent",
+    "rss",
+    "voluntary_switches",
+    "involuntary_switches",
+    "threads",
+    "migrations",
+]
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def is_supported() -> bool:
+    return Path("/proc/self/stat").exists()
+
+
+def telemetry_file_name(logdir: Path, run_id: int) -> Path:
+    return logdir / TELEMETRY_DIR / f"id-{run_id}.csv"
+
+
+def process_tree(pid: int) -> list[int]:
+    # pid followed by all of its descendants
+    pids = [pid]
+
+    for p in pids:
+        for task in Path(f"/proc/{p}/task").glob("*"):
+            try:
+                pids.extend(int(c) for c in (task / "children").read_text().split())
+            except OSError:
+                pass
+
+    return pids
+
+
+def read_process(pid: int) -> dict | None:
+    # None once the process is gone
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return None
+
+    # the command name may contain spaces, fields are counted after it
+    fields = stat[stat.rindex(")") + 2 :].split()
+    status_fields = dict(
+        line.split(":", 1) for line in status.splitlines() if ":" in line
+    )
+
+    # scheduler statistics need CONFIG_SCHED_DEBUG
+    migrations = None
+    try:
+        for line in Path(f"/proc/{pid}/sched").read_text().splitlines():
+            if line.startswith("se.nr_migrations"):
+                migrations = int(line.split(":")[1])
+    except OSError:
+        pass
+
+    return {
+        "cpu_time": (int(fields[11]) + int(fields[12])) / CLOCK_TICKS,
+        "rss": int(status_fields.get("VmRSS", "0 kB").split()[0]) * 1024,
+        "voluntary_switches": int(status_fields["voluntary_ctxt_switches"]),
+        "involuntary_switches": int(status_fields["nonvoluntary_ctxt_switches"]),
+        "threads": int(status_fields["Threads"]),
+        "migrations": migrations,
+    }
+
+
+class TelemetrySampler(threading.Thread):
+    # samples every process of every role at a fixed interval into a csv,
+    # one row per process and tick. cpu_percent is relative to one core.
+    def __init__(
+        self,
+        file_name: Path,
+        processes: dict[str, int],
+        interval: float = TELEMETRY_INTERVAL,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.file_name = file_name
+        self.processes = processes
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.last_cpu_time: dict[int, tuple[float, float]] = {}
+
+    def sample(self, writer: csv.DictWriter, t: float) -> None:
+        for role, root_pid in self.processes.items():
+            for pid in process_tree(root_pid):
+                usage = read_process(pid)
+                if usage is None:
+                    continue
+
+                last_t, last_cpu_time = self.last_cpu_time.get(pid, (t, 0.0))
+                cpu_percent = (
+                    100 * (usage["cpu_time"] - last_cpu_time) / (t - last_t)
+                    if t > last_t
+                    else 0.0
+                )
+                self.last_cpu_time[pid] = (t, usage["cpu_time"])
+
+                writer.writerow(
+                    {
+                        "t": t,
+                        "role": role,
+                        "pid": pid,
+                        "cpu_percent": cpu_percent,
+                        **usage,
+                    }
+                )
+
+    def run(self) -> None:
+        self.file_name.parent.mkdir(parents=True, exist_ok=True)
+        start_time = time.monotonic()
+
+        with open(self.file_name, "w", newline="") as file:
+            writer = csv.DictWriter(file, TELEMETRY_COLUMNS)
+            writer.writeheader()
+
+            while True:
+                self.sample(writer, time.monotonic() - start_time)
+                if self.stop_event.wait(self.interval):
+                    break
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self.join()
@@ -0,0 +1,40 @@
+import pylsl
+
+# seconds an outlet waits for its inlet before it starts pacing regardless
+CONSUMER_TIMEOUT = 60.0
+
+
+# start barrier between outlet and inlet: the inlet subscribes to the data
+# connection before it starts pulling, the outlet blocks until it sees that
+# subscription and only then starts its pacer. no sample is pushed into an
+# outlet without consumer, so the first sample sent is the first received.
+
+
+def wait_for_consumer(
+    outlet: pylsl.StreamOutlet, timeout: float = CONSUMER_TIMEOUT
+) -> float | None:
+    # seconds from outlet creation until the inlet subscribed, None on timeout
+    start_time = pylsl.local_clock()
+
+    if not outlet.wait_for_consumers(timeout):
+        return None
+
+    return pylsl.local_clock() - start_time
+
+
+def open_inlet(
+    source_id: str, max_buflen: int = 1, processing_flags: int = pylsl.proc_none
+) -> tuple[pylsl.StreamInlet, float]:
+    # resolves and subscribes, returns the inlet and the seconds it took
+    start_time = pylsl.local_clock()
+
+    streams = pylsl.resolve_byprop("source_id", source_id)
+    inlet = pylsl.StreamInlet(
+        streams[0], max_buflen=max_buflen, processing_flags=processing_flags
+    )
+    # the first time_correction() waits for the initial clock sync round
+    # trips, done before subscribing so it does not stall the first samples
+    inlet.time_correction()
+    inlet.open_stream()
+
+    return inlet, pylsl.local_clock() - start_time
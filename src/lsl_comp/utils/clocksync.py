@@ -0,0 +1,54 @@
+import math
+from typing import Any
+
+import pylsl
+
+# sample:   time_correction() for every sample (or pulled chunk)
+# interval: time_correction() every `interval` seconds, the updates are kept
+#           as a sparse series and joined back onto the samples by analyse
+# flags:    liblsl corrects (clocksync) and smooths (dejitter) the timestamps,
+#           they arrive in the local clock and no offset is logged
+CLOCKSYNC_MODES = ["sample", "interval", "flags"]
+
+
+def processing_flags(mode: str) -> int:
+    if mode == "flags":
+        return pylsl.proc_clocksync | pylsl.proc_dejitter
+
+    return pylsl.proc_none
+
+
+class ClockSync:
+    def __init__(
+        self, inlet: pylsl.StreamInlet, mode: str, interval: float = 1.0
+    ) -> None:
+        if mode not in CLOCKSYNC_MODES:
+            raise ValueError(f"Unknown clocksync mode {mode}.")
+
+        self.inlet = inlet
+        self.mode = mode
+        self.interval = interval
+
+        self.next_update = -math.inf
+        # (t_arr_inlet, offset) of every offset refresh in interval mode
+        self.updates: list[tuple[float, float]] = []
+
+    def offset(self, t_arrival: float) -> float:
+        # offset logged as t_lsl_offset, nan where it was not sampled
+        if self.mode == "sample":
+            return self.inlet.time_correction()
+
+        if self.mode == "interval" and t_arrival >= self.next_update:
+            offset = self.inlet.time_correction()
+            self.updates.append((t_arrival, offset))
+            self.next_update = t_arrival + self.interval
+            return offset
+
+        return math.nan
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "clocksync": self.mode,
+            "clocksync_interval": self.interval,
+            "offset_updates": self.updates,
+        }
@@ -0,0 +1,69 @@
+import numpy as np
+
+# log-linear (hdr style) latency histogram over integer nanoseconds. values
+# below 2**SUB_BUCKET_BITS get one bucket each, above that every power of two
+# is split into 2**(SUB_BUCKET_BITS - 1) equal buckets, i.e. a relative error
+# of at most 2**-(SUB_BUCKET_BITS - 1) (~1.6 %). histograms of different runs
+# share the same buckets, so merging is a plain sum of the counts.
+SUB_BUCKET_BITS = 7
+MAX_EXPONENT = 40  # 2**40 ns ~ 18 min
+
+SUB_BUCKET_COUNT = 2**SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT // 2
+N_BUCKETS = SUB_BUCKET_COUNT + (MAX_EXPONENT - SUB_BUCKET_BITS) * SUB_BUCKET_HALF
+
+
+def bucket_index(values_ns: np.ndarray) -> np.ndarray:
+    values_ns = np.clip(values_ns.astype(np.int64), 0, 2**MAX_EXPONENT - 1)
+
+    # floor(log2(v)), frexp is exact for integers below 2**53
+    _, exponent = np.frexp(np.maximum(values_ns, 1).astype(np.float64))
+    exponent = exponent.astype(np.int64) - 1
+
+    shift = np.maximum(exponent - SUB_BUCKET_BITS + 1, 0)
+    idx = (
+        SUB_BUCKET_COUNT
+        + (exponent - SUB_BUCKET_BITS) * SUB_BUCKET_HALF
+        + (values_ns >> shift)
+        - SUB_BUCKET_HALF
+    )
+
+    return np.where(values_ns < SUB_BUCKET_COUNT, values_ns, idx)
+
+
+def bucket_value(idx: np.ndarray) -> np.ndarray:
+    # midpoint of each bucket in nanoseconds
+    idx = np.asarray(idx, dtype=np.int64)
+    j = np.maximum(idx - SUB_BUCKET_COUNT, 0)
+
+    shift = j // SUB_BUCKET_HALF + 1
+    lower = (SUB_BUCKET_HALF + j % SUB_BUCKET_HALF) << shift
+    midpoint = lower + ((1 << shift) - 1) / 2
+
+    return np.where(idx < SUB_BUCKET_COUNT, idx.astype(np.float64), midpoint)
+
+
+def latency_histogram(latency: np.ndarray) -> np.ndarray:
+    # latency in seconds, negative values (clock offsets) land in bucket 0
+    values_ns = np.round(np.asarray(latency) * 1e9)
+    return np.bincount(bucket_index(values_ns), minlength=N_BUCKETS)
+
+
+def merge_histograms(histograms: list[np.ndarray]) -> np.ndarray:
+    return np.sum(histograms, axis=0)
+
+
+def histogram_percentiles(
+    counts: np.ndarray, percentiles: list[float]
+) -> list[float | None]:
+    # percentiles in [0, 100], returned in seconds
+    cum_counts = np.cumsum(counts)
+    total = cum_counts[-1] if len(cum_counts) > 0 else 0
+
+    if total == 0:
+        return [None for _ in percentiles]
+
+    ranks = np.maximum(np.ceil(np.asarray(percentiles) / 100 * total), 1)
+    idx = np.searchsorted(cum_counts, ranks)
+
+    return (bucket_value(idx) * 1e-9).tolist()
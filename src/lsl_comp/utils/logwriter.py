@@ -0,0 +1,229 @@
+import logging
+import threading
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+
+# column layout of the rows handed to the writers, one row per sample
+OUTLET_COLUMNS = ["t_gen_outlet", "x"]
+INLET_COLUMNS = ["window", "t_gen_outlet", "t_lsl_offset", "t_arr_inlet", "x"]
+
+INT_COLUMNS = ["window", "x"]
+
+LOG_FORMATS = {"csv": ".csv", "arrow": ".arrow"}
+
+
+class CsvLogWriter:
+    def __init__(
+        self, file_name: Path, columns: list[str], window_size: int = 1
+    ) -> None:
+        self.columns = columns
+        self.window_size = window_size
+        self.is_windowed = "window" in columns and window_size > 1
+
+        # rows of a window that has not been completed yet
+        self.pending = np.empty((0, len(columns)))
+
+        # a block is formatted by a single %-format call, ints (also stored as
+        # float) with %d and floats with %s, the same text as str(v)
+        self.written_idx = [i for i, c in enumerate(columns) if c != "window"]
+        self.value_formats = [
+            "%d" if columns[i] in INT_COLUMNS else "%s" for i in self.written_idx
+        ]
+        self.row_format = ",".join(self.value_formats) + "\n"
+        self.window_formats: dict[int, str] = {}
+
+        self.file = open(file_name, "w")
+        self.file.write(",".join([c for c in columns if c != "window"]) + "\n")
+
+    def format_rows(self, rows: np.ndarray) -> str:
+        values = rows[:, self.written_idx].ravel().tolist()
+        return (self.row_format * len(rows)) % tuple(values)
+
+    def format_window(self, rows: np.ndarray) -> str:
+        # a window is one csv line with the samples of each column joined by ';'
+        n = len(rows)
+        if n not in self.window_formats:
+            self.window_formats[n] = (
+                ",".join(";".join([f] * n) for f in self.value_formats) + "\n"
+            )
+
+        values = rows[:, self.written_idx].T.ravel().tolist()
+        return self.window_formats[n] % tuple(values)
+
+    def write_rows(self, rows: np.ndarray) -> None:
+        if not self.is_windowed:
+            self.file.write(self.format_rows(rows))
+            return
+
+        rows = np.concatenate([self.pending, rows])
+        window_col = rows[:, self.columns.index("window")]
+
+        # split into runs of equal window id, complete windows are written
+        boundaries = np.flatnonzero(np.diff(window_col)) + 1
+        windows = np.split(rows, boundaries)
+
+        self.file.write("".join(self.format_window(w) for w in windows[:-1]))
+
+        if len(windows[-1]) == self.window_size:
+            self.file.write(self.format_window(windows[-1]))
+            self.pending = rows[:0]
+        else:
+            self.pending = windows[-1]
+
+    def close(self) -> None:
+        if self.is_windowed and len(self.pending) > 0:
+            self.file.write(self.format_window(self.pending))
+
+        self.file.flush()
+        self.file.close()
+
+
+class ArrowLogWriter:
+    def __init__(
+        self, file_name: Path, columns: list[str], batch_size: int = 65_536
+    ) -> None:
+        self.columns = columns
+        self.batch_size = batch_size
+        self.schema = pa.schema(
+            [
+                (c, pa.int64() if c in INT_COLUMNS else pa.float64())
+                for c in self.columns
+            ]
+        )
+
+        # preallocated record batch, flushed to disk when full
+        self.batch = np.empty((batch_size, len(columns)), dtype=np.float64)
+        self.batch_idx = 0
+
+        self.sink = pa.OSFile(str(file_name), "wb")
+        self.writer = pa.ipc.new_file(self.sink, self.schema)
+
+    def flush_batch(self) -> None:
+        if self.batch_idx == 0:
+            return
+
+        rows = self.batch[: self.batch_idx]
+        arrays = [
+            pa.array(rows[:, i].astype(np.int64) if c in INT_COLUMNS else rows[:, i])
+            for i, c in enumerate(self.columns)
+        ]
+        self.writer.write_batch(pa.record_batch(arrays, schema=self.schema))
+        self.batch_idx = 0
+
+    def write_rows(self, rows: np.ndarray) -> None:
+        while len(rows) > 0:
+            n = min(len(rows), self.batch_size - self.batch_idx)
+            self.batch[self.batch_idx : self.batch_idx + n] = rows[:n]
+            self.batch_idx += n
+            rows = rows[n:]
+
+            if self.batch_idx == self.batch_size:
+                self.flush_batch()
+
+    def close(self) -> None:
+        self.flush_batch()
+        self.writer.close()
+        self.sink.close()
+
+
+class BackgroundLogWriter:
+    # keeps disk writes off the hot loop: rows are copied into a preallocated
+    # ring and a writer thread drains it in bulk into the wrapped writer.
+    # single producer, single consumer; when the ring is full rows are dropped
+    # and counted instead of blocking the caller.
+    def __init__(
+        self,
+        writer: CsvLogWriter | ArrowLogWriter,
+        n_columns: int,
+        capacity: int = 131_072,
+        flush_interval: float = 0.05,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        self.writer = writer
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.logger = logger
+
+        self.ring = np.empty((capacity, n_columns), dtype=np.float64)
+        # total rows written by the producer / drained by the consumer
+        self.head = 0
+        self.tail = 0
+        self.n_overflow = 0
+
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def write_row(self, *row: float) -> None:
+        if self.head - self.tail >= self.capacity:
+            self.n_overflow += 1
+            return
+
+        self.ring[self.head % self.capacity] = row
+        self.head += 1
+
+    def write_rows(self, rows: np.ndarray) -> None:
+        n_free = self.capacity - (self.head - self.tail)
+        if len(rows) > n_free:
+            self.n_overflow += len(rows) - n_free
+            rows = rows[:n_free]
+
+        start = self.head % self.capacity
+        n = min(len(rows), self.capacity - start)
+        self.ring[start : start + n] = rows[:n]
+        self.ring[: len(rows) - n] = rows[n:]
+        self.head += len(rows)
+
+    def drain(self) -> None:
+        head = self.head
+        if head == self.tail:
+            return
+
+        start, end = self.tail % self.capacity, head % self.capacity
+        if start < end:
+            rows = self.ring[start:end].copy()
+        else:
+            rows = np.concatenate([self.ring[start:], self.ring[:end]])
+
+        # the slots can be reused by the producer once the rows are copied out
+        self.tail = head
+        self.writer.write_rows(rows)
+
+    def run(self) -> None:
+        while not self.stop_event.wait(self.flush_interval):
+            self.drain()
+
+    def close(self) -> int:
+        self.stop_event.set()
+        self.thread.join()
+        self.drain()
+        self.writer.close()
+
+        if self.logger is not None:
+            if self.n_overflow > 0:
+                self.logger.warning(
+                    f"log ring overflowed, dropped {self.n_overflow} rows"
+                )
+            else:
+                self.logger.info("log ring drained without overflow")
+
+        return self.n_overflow
+
+
+def create_log_writer(
+    log_format: str,
+    file_name: Path,
+    columns: list[str],
+    window_size: int = 1,
+    logger: logging.Logger | None = None,
+) -> BackgroundLogWriter:
+    if log_format == "csv":
+        writer = CsvLogWriter(file_name, columns, window_size=window_size)
+    elif log_format == "arrow":
+        writer = ArrowLogWriter(file_name, columns)
+    else:
+        raise ValueError(f"Unknown log format {log_format}.")
+
+    return BackgroundLogWriter(writer, len(columns), logger=logger)
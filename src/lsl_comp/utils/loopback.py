@@ -0,0 +1,145 @@
+import socket
+import time
+
+import numpy as np
+
+PROTOCOLS = ["udp", "tcp"]
+HOST = "127.0.0.1"
+
+# largest udp payload over ipv4
+MAX_DATAGRAM = 65_507
+UDP_RCVBUF = 1 << 22
+
+HANDSHAKE = b"ready"
+# seconds between connection attempts of the outlet
+RETRY_INTERVAL = 0.05
+
+# outlet connects to the inlet, which listens on the port of the run. the
+# connection (tcp) or a handshake datagram answered by the inlet (udp) is the
+# start barrier, like the consumer barrier of the lsl xlets.
+
+
+def record_dtype(channels: int) -> np.dtype:
+    # packed like an lsl sample: float64 timestamp, float32 channels
+    return np.dtype([("timestamp", "<f8"), ("data", "<f4", (channels,))])
+
+
+def connect(
+    protocol: str, port: int, timeout: float
+) -> tuple[socket.socket, float | None]:
+    # outlet side, returns the socket and the seconds until the inlet
+    # answered, None on timeout
+    start_time = time.monotonic()
+    deadline = start_time + timeout
+
+    if protocol == "tcp":
+        while True:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            try:
+                sock.connect((HOST, port))
+                return sock, time.monotonic() - start_time
+            except ConnectionRefusedError:
+                sock.close()
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(RETRY_INTERVAL)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.connect((HOST, port))
+    sock.settimeout(RETRY_INTERVAL)
+    setup_time = None
+
+    while time.monotonic() < deadline:
+        try:
+            sock.send(HANDSHAKE)
+            if sock.recv(len(HANDSHAKE)) == HANDSHAKE:
+                setup_time = time.monotonic() - start_time
+                break
+        except (TimeoutError, ConnectionRefusedError):
+            # nothing bound to the port yet
+            time.sleep(RETRY_INTERVAL)
+
+    sock.settimeout(None)
+    return sock, setup_time
+
+
+def listen(protocol: str, port: int) -> socket.socket:
+    # inlet side, returns once the outlet connected
+    if protocol == "tcp":
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((HOST, port))
+        server.listen(1)
+        sock, _ = server.accept()
+        server.close()
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RCVBUF)
+    sock.bind((HOST, port))
+
+    while True:
+        data, address = sock.recvfrom(len(HANDSHAKE))
+        if data == HANDSHAKE:
+            sock.connect(address)
+            sock.send(HANDSHAKE)
+            return sock
+
+
+def send_records(sock: socket.socket, protocol: str, records: np.ndarray) -> None:
+    # one write per push, udp pushes larger than a datagram are split
+    if protocol == "tcp":
+        sock.sendall(records.view(np.uint8))
+        return
+
+    step = MAX_DATAGRAM // records.dtype.itemsize
+    for k in range(0, len(records), step):
+        sock.send(records[k : k + step].view(np.uint8))
+
+
+class RecordReader:
+    # reassembles whole records from a tcp byte stream or udp datagrams
+    def __init__(
+        self, sock: socket.socket, protocol: str, dtype: np.dtype, max_records: int
+    ) -> None:
+        self.sock = sock
+        self.protocol = protocol
+        self.dtype = dtype
+
+        size = max_records * dtype.itemsize
+        self.buffer = bytearray(MAX_DATAGRAM if protocol == "udp" else size)
+        self.view = memoryview(self.buffer)
+        self.filled = 0
+
+    def read(self) -> np.ndarray:
+        # blocks until at least one record arrived, empty when the outlet
+        # closed the connection (tcp) or went silent (udp with a timeout)
+        itemsize = self.dtype.itemsize
+
+        while True:
+            try:
+                n = self.sock.recv_into(self.view[self.filled :])
+            except TimeoutError:
+                return np.empty(0, dtype=self.dtype)
+
+            if self.protocol == "udp":
+                # a late answered handshake leaves repeated ones queued
+                # behind the first, they hold no record and are skipped
+                if n < itemsize:
+                    continue
+                return np.frombuffer(self.buffer, self.dtype, n // itemsize).copy()
+
+            if n == 0:
+                return np.empty(0, dtype=self.dtype)
+
+            self.filled += n
+            k = self.filled // itemsize
+
+            if k > 0:
+                records = np.frombuffer(self.buffer, self.dtype, k).copy()
+                rest = self.filled - k * itemsize
+                self.buffer[:rest] = self.buffer[k * itemsize : self.filled]
+                self.filled = rest
+                return records
@@ -0,0 +1,86 @@
+import time
+import asyncio
+from array import array
+from collections import Counter
+from typing import Any
+
+import numpy as np
+import pylsl
+
+
+class Pacer:
+    # paces a source at fs against absolute deadlines (start + (k + 1) / fs)
+    # so late wake-ups never accumulate into drift. the last `spin` seconds
+    # before a deadline are busy-waited instead of slept, trading cpu for
+    # precision below the os timer resolution.
+    def __init__(self, fs: float, spin: float = 0.0) -> None:
+        self.fs = fs
+        self.spin = spin
+
+        self.start_time = 0.0
+        self.n_released = 0
+
+        # wake-up error per tick and number of samples released per tick
+        self.jitter = array("d")
+        self.bursts = Counter()
+
+    def start(self) -> None:
+        self.start_time = pylsl.local_clock()
+        self.n_released = 0
+
+    def due(self) -> int:
+        # number of samples whose deadline has passed since the last call
+        elapsed_time = pylsl.local_clock() - self.start_time
+        n = int(self.fs * elapsed_time) - self.n_released
+
+        if n > 0:
+            self.n_released += n
+            self.bursts[n] += 1
+
+        return max(n, 0)
+
+    def next_deadline(self, n: int = 1) -> float:
+        # deadline of the n-th sample not released yet
+        return self.start_time + (self.n_released + n) / self.fs
+
+    def spin_until(self, deadline: float) -> None:
+        while pylsl.local_clock() < deadline:
+            pass
+
+        self.jitter.append(pylsl.local_clock() - deadline)
+
+    def sleep(self, n: int = 1) -> None:
+        deadline = self.next_deadline(n)
+
+        remaining = deadline - pylsl.local_clock() - self.spin
+        if remaining > 0:
+            time.sleep(remaining)
+
+        self.spin_until(deadline)
+
+    async def async_sleep(self, n: int = 1) -> None:
+        deadline = self.next_deadline(n)
+
+        remaining = deadline - pylsl.local_clock() - self.spin
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+        self.spin_until(deadline)
+
+    def summary(self) -> dict[str, Any]:
+        jitter = np.frombuffer(self.jitter, dtype=np.float64)
+
+        if len(jitter) == 0:
+            jitter = np.zeros(1)
+
+        return {
+            "fs": self.fs,
+            "spin": self.spin,
+            "n_ticks": len(self.jitter),
+            "jitter_mean": np.mean(jitter).item(),
+            "jitter_std": np.std(jitter).item(),
+            "jitter_p50": np.percentile(jitter, 50).item(),
+            "jitter_p99": np.percentile(jitter, 99).item(),
+            "jitter_max": np.max(jitter).item(),
+            "burst_histogram": {str(k): v for k, v in sorted(self.bursts.items())},
+        }
@@ -0,0 +1,46 @@
+import numpy as np
+
+# huber loss linear fit by iteratively reweighted least squares. residuals
+# within HUBER_K robust standard deviations (mad) are weighted as in least
+# squares, larger ones only linearly, so single clock sync outliers or jumps
+# do not tilt the drift estimate.
+HUBER_K = 1.345
+MAX_ITERATIONS = 50
+
+
+def robust_scale(residuals: np.ndarray) -> float:
+    # median absolute deviation, scaled to the std of a normal distribution
+    return 1.4826 * np.median(np.abs(residuals - np.median(residuals))).item()
+
+
+def huber_fit(
+    x: np.ndarray, y: np.ndarray, tol: float = 1e-12
+) -> tuple[float, float, np.ndarray]:
+    # returns slope, intercept and the residuals y - (intercept + slope * x)
+    # x is centred for conditioning, timestamps are large compared to a run
+    x0 = np.mean(x)
+    design = np.column_stack([np.ones_like(x), x - x0])
+    weights = np.ones_like(y)
+    coef = np.zeros(2)
+
+    for _ in range(MAX_ITERATIONS):
+        sqrt_w = np.sqrt(weights)
+        new_coef, *_ = np.linalg.lstsq(design * sqrt_w[:, None], y * sqrt_w, rcond=None)
+
+        residuals = y - design @ new_coef
+        scale = robust_scale(residuals)
+        if scale == 0:
+            coef = new_coef
+            break
+
+        abs_r = np.abs(residuals) / (HUBER_K * scale)
+        weights = np.where(abs_r <= 1, 1.0, 1 / np.maximum(abs_r, 1e-300))
+
+        is_converged = np.all(np.abs(new_coef - coef) <= tol)
+        coef = new_coef
+        if is_converged:
+            break
+
+    intercept, slope = coef
+    intercept -= slope * x0
+    return slope.item(), intercept.item(), y - (intercept + slope * x)
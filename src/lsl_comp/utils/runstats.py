@@ -0,0 +1,23 @@
+import json
+from pathlib import Path
+from typing import Any
+
+
+def stats_file_name(log_file_name: Path) -> Path:
+    return log_file_name.with_suffix(".json")
+
+
+def write_run_stats(log_file_name: Path, stats: dict[str, Any]) -> None:
+    # per-run summary written next to the log file, read back by analyse
+    with open(stats_file_name(log_file_name), "w") as file:
+        json.dump(stats, file, indent=2)
+
+
+def read_run_stats(log_file_name: Path) -> dict[str, Any]:
+    file_name = stats_file_name(log_file_name)
+
+    if not file_name.exists():
+        return {}
+
+    with open(file_name) as file:
+        return json.load(file)
@@ -0,0 +1,120 @@
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+# header of uint64 words, producer and consumer fields on separate cache lines
+HEAD, CAPACITY, WIDTH = 0, 1, 2
+TAIL, READY = 8, 9
+HEADER_WORDS = 16
+
+# seconds between polls of a waiting producer or consumer
+POLL_INTERVAL = 50e-6
+
+
+def shm_name(stream_name: str) -> str:
+    return f"lslcomp_{stream_name}"
+
+
+class ShmRing:
+    # single-producer single-consumer ring of float64 records in shared
+    # memory. the producer copies records in and only then advances head,
+    # the consumer copies them out and only then advances tail; both counters
+    # are aligned 8 byte words written by one side only, so no lock is
+    # needed. this relies on stores not being reordered (x86-64 tso), on
+    # weaker memory models it is a best-effort baseline.
+    def __init__(
+        self, name: str, capacity: int = 0, width: int = 0, create: bool = False
+    ) -> None:
+        self.is_owner = create
+
+        if create:
+            size = 8 * (HEADER_WORDS + capacity * width)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # the producer owns the segment, without this the consumer's
+            # resource tracker would unlink it when the consumer exits
+            resource_tracker.unregister(self.shm._name, "shared_memory")  # type: ignore
+
+        self.header = np.ndarray((HEADER_WORDS,), dtype=np.uint64, buffer=self.shm.buf)
+
+        if create:
+            # capacity is written last, a consumer attaches once it is set
+            self.header[:] = 0
+            self.header[WIDTH] = width
+            self.header[CAPACITY] = capacity
+
+        self.capacity = int(self.header[CAPACITY])
+        self.width = int(self.header[WIDTH])
+        self.data = np.ndarray(
+            (self.capacity, self.width),
+            dtype=np.float64,
+            buffer=self.shm.buf,
+            offset=8 * HEADER_WORDS,
+        )
+
+    @classmethod
+    def attach(cls, name: str) -> "ShmRing":
+        # waits until the producer created and sized the segment, like
+        # resolving a stream
+        while True:
+            try:
+                ring = cls(name)
+            except (FileNotFoundError, ValueError):
+                time.sleep(POLL_INTERVAL)
+                continue
+
+            if ring.capacity > 0 and ring.width > 0:
+                return ring
+
+            ring.close()
+            time.sleep(POLL_INTERVAL)
+
+    def set_ready(self) -> None:
+        self.header[READY] = 1
+
+    def wait_ready(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+
+        while self.header[READY] == 0:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(POLL_INTERVAL)
+
+        return True
+
+    def write(self, rows: np.ndarray) -> None:
+        # blocks while the ring is full, records are never dropped
+        n = len(rows)
+        head = int(self.header[HEAD])
+
+        while head + n - int(self.header[TAIL]) > self.capacity:
+            time.sleep(POLL_INTERVAL)
+
+        start = head % self.capacity
+        k = min(n, self.capacity - start)
+        self.data[start : start + k] = rows[:k]
+        self.data[: n - k] = rows[k:]
+
+        self.header[HEAD] = head + n
+
+    def read(self, max_rows: int) -> np.ndarray:
+        # copies out up to max_rows records, empty when none are available
+        tail = int(self.header[TAIL])
+        n = min(int(self.header[HEAD]) - tail, max_rows)
+
+        start = tail % self.capacity
+        k = min(n, self.capacity - start)
+        rows = np.concatenate([self.data[start : start + k], self.data[: n - k]])
+
+        self.header[TAIL] = tail + n
+        return rows
+
+    def close(self) -> None:
+        # views have to be released before the segment can be closed
+        del self.header, self.data
+        self.shm.close()
+
+        if self.is_owner:
+            self.shm.unlink()
@@ -0,0 +1,27 @@
+import numpy as np
+
+# welch's method in plain numpy: hann windowed segments with 50 % overlap,
+# mean removed per segment, one-sided density averaged over the segments.
+# all segments are views of the input, the ffts run as one batched call.
+NPERSEG = 1024
+
+
+def welch_psd(
+    x: np.ndarray, fs: float, nperseg: int = NPERSEG
+) -> tuple[np.ndarray, np.ndarray]:
+    nperseg = min(nperseg, len(x))
+    if nperseg < 2:
+        return np.empty(0), np.empty(0)
+
+    step = nperseg // 2
+    segments = np.lib.stride_tricks.sliding_window_view(x, nperseg)[::step]
+    segments = segments - segments.mean(axis=1, keepdims=True)
+
+    window = np.hanning(nperseg)
+    spectra = np.fft.rfft(segments * window, axis=1)
+    psd = np.mean(np.abs(spectra) ** 2, axis=0) / (fs * np.sum(window**2))
+
+    # every bin but dc and nyquist holds the power of both halves
+    psd[1 : nperseg - nperseg // 2] *= 2
+
+    return np.fft.rfftfreq(nperseg, d=1 / fs), psd
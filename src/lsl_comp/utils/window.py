@@ -0,0 +1,54 @@
+import numpy as np
+
+from lsl_comp.utils.logwriter import INLET_COLUMNS
+
+# fields of a buffered sample, the window id is added when a window is flushed
+SAMPLE_FIELDS = INLET_COLUMNS[1:]
+
+
+class WindowBuffer:
+    # preallocated (window_size, 4) buffer of inlet samples, filled in place
+    # instead of a deque of tuples. a flushed window is returned as one block
+    # of rows laid out as INLET_COLUMNS.
+    def __init__(self, window_size: int) -> None:
+        self.window_size = window_size
+        self.buffer = np.empty((window_size, len(SAMPLE_FIELDS)))
+        self.n = 0
+        self.window_id = 0
+
+    def __len__(self) -> int:
+        return self.n
+
+    def is_full(self) -> bool:
+        return self.n == self.window_size
+
+    def append(
+        self, t_gen_outlet: float, t_offset: float, t_arrival: float, sample: float
+    ) -> None:
+        self.buffer[self.n] = (t_gen_outlet, t_offset, t_arrival, sample)
+        self.n += 1
+
+    def extend(self, block: np.ndarray) -> list[np.ndarray]:
+        # block of samples (n, 4), returns the rows of every completed window
+        windows = []
+
+        while len(block) > 0:
+            k = min(len(block), self.window_size - self.n)
+            self.buffer[self.n : self.n + k] = block[:k]
+            self.n += k
+            block = block[k:]
+
+            if self.is_full():
+                windows.append(self.flush())
+
+        return windows
+
+    def flush(self) -> np.ndarray:
+        # rows of the buffered (possibly partial) window, starts the next one
+        rows = np.empty((self.n, len(INLET_COLUMNS)))
+        rows[:, 0] = self.window_id
+        rows[:, 1:] = self.buffer[: self.n]
+
+        self.n = 0
+        self.window_id += 1
+        return rows
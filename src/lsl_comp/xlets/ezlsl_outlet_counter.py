@@ -1,5 +1,5 @@
-import asyncio
 from typing import Any
+from pathlib import Path
 from collections.abc import AsyncGenerator
 
 import numpy as np
@@ -9,6 +9,11 @@ import ezmsg.core as ez
 from ezmsg.util.messages.axisarray import AxisArray
 from ezmsg.lsl.outlet import LSLOutletSettings, LSLOutletUnit
 
+from lsl_comp.utils.pacer import Pacer
+from lsl_comp.utils.runstats import write_run_stats
+
+LOG_FILE_NAME = Path("./logs/lslcomp/ezlsl-outlet-counter-push.csv")
+
 
 # ==================================================================
 
@@ -16,6 +21,12 @@ from ezmsg.lsl.outlet import LSLOutletSettings, LSLOutletUnit
 class CountSettings(ez.Settings):
     total_count: int
     fs: int
+    spin: float = 0.0
+    channels: int = 1
+    # one AxisArray with every sample due per pacing tick instead of per sample
+    block: bool = False
+    # pacing summary is written next to this log file when given
+    log_file_name: Path | None = None
 
 
 class CountUnit(ez.Unit):
@@ -26,48 +37,51 @@ class CountUnit(ez.Unit):
 
     @ez.publisher(OUTPUT)
     async def count(self) -> AsyncGenerator:
-        start_time = pylsl.local_clock()
-        sent_samples = 0
+        fs = self.SETTINGS.fs
+        pacer = Pacer(fs, spin=self.SETTINGS.spin)
+        pacer.start()
         n = 0
 
-        while n < self.SETTINGS.total_count:
-            elapsed_time = pylsl.local_clock() - start_time
-            required_samples = int(self.SETTINGS.fs * elapsed_time) - sent_samples
-
-            for _ in range(required_samples):
-                mysample = AxisArray(
-                    data=np.array([n])[:, np.newaxis],
-                    dims=["time", "ch"],
-                    axes={
-                        "time": AxisArray.TimeAxis(fs=self.SETTINGS.fs),
-                        "ch": AxisArray.CoordinateAxis(
-                            data=np.array(["Ch0"]),
-                            dims=["ch"],
-                        ),
-                    },
-                )
-                yield (self.OUTPUT, mysample)
-                n += 1
-
-            sent_samples += required_samples
-
-            await asyncio.sleep(1 / self.SETTINGS.fs)
-
-        yield (
-            self.OUTPUT,
-            AxisArray(
-                data=np.array([-1])[:, np.newaxis],
-                dims=["time", "ch"],
-                axes={
-                    "time": AxisArray.TimeAxis(fs=self.SETTINGS.fs),
-                    "ch": AxisArray.CoordinateAxis(
-                        data=np.array([f"Ch{_}" for _ in range(1)]),
-                        dims=["ch"],
-                    ),
-                },
-            ),
+        # counter in channel 0, the remaining channels are zero filler.
+        # the channel axis is shared by all messages, only the time axis
+        # offset changes from block to block.
+        ch_axis = AxisArray.CoordinateAxis(
+            data=np.array([f"Ch{_}" for _ in range(self.SETTINGS.channels)]),
+            dims=["ch"],
         )
 
+        def block(start: int, n_samples: int) -> AxisArray:
+            data = np.zeros((n_samples, self.SETTINGS.channels))
+            data[:, 0] = np.arange(start, start + n_samples)
+
+            # lsl convention: stamped with the time of the last sample
+            offset = pylsl.local_clock() - (n_samples - 1) / fs
+            return AxisArray(
+                data=data,
+                dims=["time", "ch"],
+                axes={"time": AxisArray.TimeAxis(fs=fs, offset=offset), "ch": ch_axis},
+            )
+
+        while n < self.SETTINGS.total_count:
+            required_samples = min(pacer.due(), self.SETTINGS.total_count - n)
+
+            if self.SETTINGS.block and required_samples > 0:
+                yield (self.OUTPUT, block(n, required_samples))
+                n += required_samples
+            else:
+                for _ in range(required_samples):
+                    yield (self.OUTPUT, block(n, 1))
+                    n += 1
+
+            await pacer.async_sleep()
+
+        if self.SETTINGS.log_file_name is not None:
+            write_run_stats(self.SETTINGS.log_file_name, {"pacing": pacer.summary()})
+
+        last = block(0, 1)
+        last.data[0, 0] = -1
+        yield (self.OUTPUT, last)
+
         raise ez.Complete
 
 
@@ -83,7 +97,7 @@ class LogUnit(ez.Unit):
     INPUT = ez.InputStream(Any)
 
     def initialize(self) -> None:
-        self.STATE.file = open("./logs/lslcomp/ezlsl-outlet-counter-push.csv", "w")
+        self.STATE.file = open(LOG_FILE_NAME, "w")
         self.STATE.file.write(
             ",".join(
                 [
@@ -95,26 +109,29 @@ class LogUnit(ez.Unit):
 
     @ez.subscriber(INPUT)
     async def on_message(self, message: AxisArray) -> None:
-        message = message.data.item()
-
         curr_time = pylsl.local_clock()
-        print(curr_time, message)
 
-        if message == -1:
-            print("closing outlet and writing logs to disk...")
-            self.STATE.file.flush()
-            self.STATE.file.close()
+        for x in message.data[:, 0].tolist():
+            print(curr_time, x)
 
-            raise ez.Complete
+            if x == -1:
+                print("closing outlet and writing logs to disk...")
+                self.STATE.file.flush()
+                self.STATE.file.close()
 
-        else:
-            self.STATE.file.write(f"{curr_time},{message}\n")
+                raise ez.Complete
+
+            else:
+                self.STATE.file.write(f"{curr_time},{x}\n")
 
 
 # ==================================================================
 class CountSystemSettings(ez.Settings):
     total_count: int
     fs: int
+    spin: float = 0.0
+    channels: int = 1
+    block: bool = False
 
 
 class CountSystem(ez.Collection):
@@ -126,7 +143,14 @@ class CountSystem(ez.Collection):
 
     def configure(self) -> None:
         self.COUNT.apply_settings(
-            CountSettings(total_count=self.SETTINGS.total_count, fs=self.SETTINGS.fs)
+            CountSettings(
+                total_count=self.SETTINGS.total_count,
+                fs=self.SETTINGS.fs,
+                spin=self.SETTINGS.spin,
+                channels=self.SETTINGS.channels,
+                block=self.SETTINGS.block,
+                log_file_name=LOG_FILE_NAME,
+            )
         )
         self.LSL_OUTLET.apply_settings(
             LSLOutletSettings(stream_name="counter", stream_type="counter")
@@ -144,6 +168,8 @@ class CountSystem(ez.Collection):
 
 
 if __name__ == "__main__":
-    settings = CountSystemSettings(total_count=2000, fs=1000)
+    settings = CountSystemSettings(
+        total_count=2000, fs=1000, spin=0.0, channels=1, block=False
+    )
     system = CountSystem(settings)
     ez.run({"system": system})
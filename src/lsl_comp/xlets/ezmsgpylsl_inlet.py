@@ -5,6 +5,8 @@ import click
 import ezmsg.core as ez
 
 from lsl_comp.utils.pylogger import logger_creator
+from lsl_comp.utils.clocksync import CLOCKSYNC_MODES
+from lsl_comp.utils.logwriter import LOG_FORMATS
 from lsl_comp.ez_utils.units.log import LogInletSettings, LogInletUnit
 from lsl_comp.ez_utils.units.lsl import LSLInletSettings, LSLInletUnit
 
@@ -14,6 +16,10 @@ class SystemSettings(ez.Settings):
     window_size: int
     multiproc: bool
     log_file_name: Path
+    log_format: str
+    clocksync: str
+    clocksync_interval: float
+    pull_mode: str
     stream_name: str
     logger: logging.Logger
 
@@ -32,6 +38,10 @@ class System(ez.Collection):
                     window_size=self.SETTINGS.window_size,
                     stream_name=self.SETTINGS.stream_name,
                     logger=self.SETTINGS.logger,
+                    log_file_name=self.SETTINGS.log_file_name,
+                    clocksync=self.SETTINGS.clocksync,
+                    clocksync_interval=self.SETTINGS.clocksync_interval,
+                    pull_mode=self.SETTINGS.pull_mode,
                 )
             )
         )
@@ -41,6 +51,7 @@ class System(ez.Collection):
                 log_file_name=self.SETTINGS.log_file_name,
                 window_size=self.SETTINGS.window_size,
                 logger=self.SETTINGS.logger,
+                log_format=self.SETTINGS.log_format,
             )
         )
 
@@ -58,21 +69,80 @@ class System(ez.Collection):
 @click.option("--fs", type=click.INT, help="Sampling rate.", required=True)
 @click.option("--mp", type=click.BOOL, help="Multiprocessing.", required=True)
 @click.option("--ws", type=click.INT, help="Window size.", required=True)
+@click.option("--chunk", type=click.INT, help="Samples per push/pull.", default=1)
+@click.option(
+    "--channels",
+    type=click.INT,
+    help="Channels per sample (counter in channel 0).",
+    default=1,
+)
 @click.option(
     "--datatype", type=click.STRING, help="counter, airsignal.", required=True
 )
 @click.option("--platform", type=click.STRING, help="Platform (os).", required=True)
+@click.option(
+    "--log-format",
+    type=click.Choice(list(LOG_FORMATS)),
+    help="Log file format.",
+    default="csv",
+)
+@click.option(
+    "--clocksync",
+    type=click.Choice(CLOCKSYNC_MODES),
+    help="Clock offset tracking of the inlet.",
+    default="sample",
+)
+@click.option(
+    "--clocksync-interval",
+    type=click.FLOAT,
+    help="Seconds between offset refreshes with --clocksync interval.",
+    default=1.0,
+)
+@click.option(
+    "--pull-mode",
+    type=click.Choice(["blocking", "thread"]),
+    help="Pull in the event loop or on a reader thread.",
+    default="blocking",
+)
+@click.option(
+    "--stream-name",
+    type=click.STRING,
+    help="LSL stream name and source id (default: datatype).",
+    default=None,
+)
+@click.option(
+    "--graph-port",
+    type=click.INT,
+    help="Port of a dedicated ezmsg graph server (default: shared server).",
+    default=None,
+)
 @click.option("--verbose", type=click.BOOL, help="Verbosity.", default=True)
 @click.option(
     "--id", type=click.INT, help="Run ID to pair inlet and outlet.", required=True
 )
 def main(
-    fs: int, mp: bool, ws: int, datatype: str, platform: str, verbose: bool, id: int
+    fs: int,
+    mp: bool,
+    ws: int,
+    chunk: int,
+    channels: int,
+    datatype: str,
+    platform: str,
+    log_format: str,
+    clocksync: str,
+    clocksync_interval: float,
+    pull_mode: str,
+    stream_name: str | None,
+    graph_port: int | None,
+    verbose: bool,
+    id: int,
 ):
     logger = logger_creator(verbose)
 
+    # the threaded reader is compared as an inlet of its own
+    xlet = "ezmsgpylsl" if pull_mode == "blocking" else "ezmsgpylslthread"
     file_name = Path(
-        f"./logs/id-{id}_inlet-ezmsgpylsl_datatype-{datatype}_platform-{platform}_multiproc-{str(mp)}_fs-{fs}_window-{ws}.csv"
+        f"./logs/id-{id}_inlet-{xlet}_datatype-{datatype}_platform-{platform}_multiproc-{str(mp)}_fs-{fs}_window-{ws}_chunk-{chunk}_channels-{channels}_clocksync-{clocksync}{LOG_FORMATS[log_format]}"
     )
     click.echo(f"Logs: {file_name}")
 
@@ -81,11 +151,17 @@ def main(
         fs=fs,
         multiproc=mp,
         log_file_name=file_name,
-        stream_name=datatype,
+        log_format=log_format,
+        clocksync=clocksync,
+        clocksync_interval=clocksync_interval,
+        pull_mode=pull_mode,
+        stream_name=stream_name or datatype,
         logger=logger,
     )
     system = System(settings)
-    ez.run({"system": system})
+    # a dedicated graph server keeps the topics of concurrent runs apart
+    graph_address = ("127.0.0.1", graph_port) if graph_port else None
+    ez.run({"system": system}, graph_address=graph_address, auto_start=True)
 
 
 if __name__ == "__main__":
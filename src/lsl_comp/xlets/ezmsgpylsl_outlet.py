@@ -1,5 +1,6 @@
 import sys
 import logging
+import subprocess
 from pathlib import Path
 
 import click
@@ -8,10 +9,21 @@ from ezmsg.blackrock.nsp import NSPSource, NSPSourceSettings
 
 
 from lsl_comp.utils.pylogger import logger_creator
-from lsl_comp.ez_utils.units.nsp import NSPExtractorSettings, NSPExtractorUnit
+from lsl_comp.utils.clocksync import CLOCKSYNC_MODES
+from lsl_comp.utils.logwriter import LOG_FORMATS
+from lsl_comp.ez_utils.units.nsp import (
+    COUNTER_CHANNEL,
+    NSPExtractorSettings,
+    NSPExtractorUnit,
+    channel_subset,
+)
 from lsl_comp.ez_utils.units.log import LogOutletSettings, LogOutletUnit
 from lsl_comp.ez_utils.units.count import CountSettings, CountUnit
 from lsl_comp.ez_utils.units.lsl import LSLOutletSettings, LSLOutletUnit
+from lsl_comp.utils.loopback import HOST
+from lsl_comp.xlets.nsp_simulator import GROUP_FS
+
+NSP_SIMULATOR = Path(__file__).parent / "nsp_simulator.py"
 
 
 # ==================================================================
@@ -20,10 +32,19 @@ from lsl_comp.ez_utils.units.lsl import LSLOutletSettings, LSLOutletUnit
 class SystemSettings(ez.Settings):
     total_count: int
     fs: int
+    spin: float
+    chunk: int
+    block_type: str
+    channels: int
     multiproc: bool
     log_file_name: Path
+    log_format: str
     stream_name: str
     logger: logging.Logger
+    # device the airsignal system connects to and the port it receives on
+    nsp_addr: str = "192.168.137.128"
+    nsp_port: int = 51001
+    client_port: int = 51002
 
 
 # ==================================================================
@@ -38,24 +59,38 @@ class CountSystem(ez.Collection):
 
     def configure(self) -> None:
         self.COUNT.apply_settings(
-            CountSettings(total_count=self.SETTINGS.total_count, fs=self.SETTINGS.fs)
+            CountSettings(
+                total_count=self.SETTINGS.total_count,
+                fs=self.SETTINGS.fs,
+                spin=self.SETTINGS.spin,
+                chunk=self.SETTINGS.chunk,
+                block_type=self.SETTINGS.block_type,
+                log_file_name=self.SETTINGS.log_file_name,
+                wait_for_consumer=True,
+            )
         )
 
         self.OUTLET.apply_settings(
             (
                 LSLOutletSettings(
-                    fs=self.SETTINGS.fs, stream_name=self.SETTINGS.stream_name
+                    fs=self.SETTINGS.fs,
+                    stream_name=self.SETTINGS.stream_name,
+                    channels=self.SETTINGS.channels,
+                    chunk=self.SETTINGS.chunk,
                 )
             )
         )
         self.LOG.apply_settings(
             LogOutletSettings(
-                log_file_name=self.SETTINGS.log_file_name, logger=self.SETTINGS.logger
+                log_file_name=self.SETTINGS.log_file_name,
+                logger=self.SETTINGS.logger,
+                log_format=self.SETTINGS.log_format,
             )
         )
 
     def network(self) -> ez.NetworkDefinition:
         return (
+            (self.OUTLET.OUTPUT_READY, self.COUNT.INPUT_READY),
             (self.COUNT.OUTPUT, self.OUTLET.INPUT),
             (self.COUNT.OUTPUT, self.LOG.INPUT),
         )
@@ -81,10 +116,10 @@ class AirsignalSystem(ez.Collection):
     def configure(self) -> None:
         self.NSP.apply_settings(
             NSPSourceSettings(
-                inst_addr="192.168.137.128",
-                inst_port=51001,
+                inst_addr=self.SETTINGS.nsp_addr,
+                inst_port=self.SETTINGS.nsp_port,
                 client_addr="",
-                client_port=51002,
+                client_port=self.SETTINGS.client_port,
                 recv_bufsize=(8 if sys.platform == "win32" else 6) * 1024 * 1024,
                 protocol="4.1",
                 cont_buffer_dur=0.5,
@@ -92,17 +127,27 @@ class AirsignalSystem(ez.Collection):
                 cbtime=False,
             )
         )
-        self.EXT.apply_settings(NSPExtractorSettings(tc=self.SETTINGS.total_count))
+        self.EXT.apply_settings(
+            NSPExtractorSettings(
+                tc=self.SETTINGS.total_count,
+                channels=channel_subset(self.SETTINGS.channels),
+                block_type=self.SETTINGS.block_type,
+            )
+        )
         self.OUTLET.apply_settings(
             (
                 LSLOutletSettings(
-                    fs=self.SETTINGS.fs, stream_name=self.SETTINGS.stream_name
+                    fs=self.SETTINGS.fs,
+                    stream_name=self.SETTINGS.stream_name,
+                    channels=self.SETTINGS.channels,
                 )
             )
         )
         self.LOG.apply_settings(
             LogOutletSettings(
-                log_file_name=self.SETTINGS.log_file_name, logger=self.SETTINGS.logger
+                log_file_name=self.SETTINGS.log_file_name,
+                logger=self.SETTINGS.logger,
+                log_format=self.SETTINGS.log_format,
             )
         )
 
@@ -128,10 +173,79 @@ class AirsignalSystem(ez.Collection):
 @click.option("--fs", type=click.INT, help="Sampling rate.", required=True)
 @click.option("--mp", type=click.BOOL, help="Multiprocessing.", required=True)
 @click.option("--ws", type=click.INT, help="Inlet window size.", required=True)
+@click.option(
+    "--chunk",
+    type=click.INT,
+    help="Samples per push (1 = Message per sample, else AxisArray blocks).",
+    default=1,
+)
+@click.option(
+    "--block-type",
+    type=click.Choice(["axisarray", "batch"]),
+    help="Message type of a block when chunk > 1.",
+    default="axisarray",
+)
+@click.option(
+    "--spin",
+    type=click.FLOAT,
+    help="Seconds busy-waited before each pacing deadline.",
+    default=0.0,
+)
+@click.option(
+    "--channels",
+    type=click.INT,
+    help="Channels per sample (counter in channel 0).",
+    default=1,
+)
 @click.option(
     "--datatype", type=click.STRING, help="counter, airsignal.", required=True
 )
 @click.option("--platform", type=click.STRING, help="Platform (os).", required=True)
+@click.option(
+    "--log-format",
+    type=click.Choice(list(LOG_FORMATS)),
+    help="Log file format.",
+    default="csv",
+)
+@click.option(
+    "--clocksync",
+    type=click.Choice(CLOCKSYNC_MODES),
+    help="Clock offset tracking of the inlet.",
+    default="sample",
+)
+@click.option(
+    "--stream-name",
+    type=click.STRING,
+    help="LSL stream name and source id (default: datatype).",
+    default=None,
+)
+@click.option(
+    "--graph-port",
+    type=click.INT,
+    help="Port of a dedicated ezmsg graph server (default: shared server).",
+    default=None,
+)
+@click.option(
+    "--nsp-addr",
+    type=click.STRING,
+    help="Address of the nsp (airsignal).",
+    default="192.168.137.128",
+)
+@click.option(
+    "--nsp-port", type=click.INT, help="Port of the nsp (airsignal).", default=51001
+)
+@click.option(
+    "--client-port",
+    type=click.INT,
+    help="Port the nsp streams to (airsignal).",
+    default=51002,
+)
+@click.option(
+    "--nsp-sim",
+    is_flag=True,
+    help="Start a simulated nsp on loopback and connect to it (airsignal).",
+    default=False,
+)
 @click.option("--verbose", type=click.BOOL, help="Verbosity.", default=True)
 @click.option(
     "--id", type=click.INT, help="Run ID to pair inlet and outlet.", required=True
@@ -141,25 +255,76 @@ def main(
     fs: int,
     mp: bool,
     ws: int,
+    chunk: int,
+    block_type: str,
+    channels: int,
+    spin: float,
     datatype: str,
     platform: str,
+    log_format: str,
+    clocksync: str,
+    stream_name: str | None,
+    graph_port: int | None,
+    nsp_addr: str,
+    nsp_port: int,
+    client_port: int,
+    nsp_sim: bool,
     verbose: bool,
     id: int,
 ):
     logger = logger_creator(verbose)
 
     file_name = Path(
-        f"./logs/id-{id}_outlet-ezmsgpylsl_datatype-{datatype}_platform-{platform}_multiproc-{str(mp)}_fs-{fs}_window-{ws}.csv"
+        f"./logs/id-{id}_outlet-ezmsgpylsl_datatype-{datatype}_platform-{platform}_multiproc-{str(mp)}_fs-{fs}_window-{ws}_chunk-{chunk}_channels-{channels}_clocksync-{clocksync}{LOG_FORMATS[log_format]}"
     )
     click.echo(f"Logs: {file_name}")
 
+    simulator = None
+    if nsp_sim and datatype == "airsignal":
+        if fs not in GROUP_FS.values():
+            raise click.BadParameter(
+                f"the simulated nsp samples at {sorted(GROUP_FS.values())} Hz",
+                param_hint="--fs",
+            )
+
+        # streaming starts once NSPSource requested the config
+        nsp_addr = HOST
+        simulator = subprocess.Popen(
+            [
+                sys.executable,
+                str(NSP_SIMULATOR),
+                "--fs",
+                str(fs),
+                "--channels",
+                str(max(channels, COUNTER_CHANNEL + 1)),
+                "--addr",
+                nsp_addr,
+                "--port",
+                str(nsp_port),
+                "--verbose",
+                str(verbose),
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        # the simulator announces itself once its port is bound
+        click.echo(simulator.stdout.readline().strip())
+
     settings = SystemSettings(
         total_count=tc,
         fs=fs,
+        spin=spin,
+        chunk=chunk,
+        block_type=block_type,
+        channels=channels,
         multiproc=mp,
         log_file_name=file_name,
-        stream_name=datatype,
+        log_format=log_format,
+        stream_name=stream_name or datatype,
         logger=logger,
+        nsp_addr=nsp_addr,
+        nsp_port=nsp_port,
+        client_port=client_port,
     )
 
     if datatype == "counter":
@@ -169,7 +334,14 @@ def main(
     else:
         raise ValueError("Incompatible datatype.")
 
-    ez.run({"system": system})
+    # a dedicated graph server keeps the topics of concurrent runs apart
+    graph_address = ("127.0.0.1", graph_port) if graph_port else None
+    try:
+        ez.run({"system": system}, graph_address=graph_address, auto_start=True)
+    finally:
+        if simulator is not None:
+            simulator.terminate()
+            simulator.wait()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,305 @@
+import ctypes
+import os
+import socket
+import struct
+import time
+
+import click
+import numpy as np
+from pycbsdk.cbhw.device.nsp import CBChanCaps, CBRunLevel
+from pycbsdk.cbhw.packet.abstract import CBPacketVarLen
+from pycbsdk.cbhw.packet.common import CBPacketType, CBSpecialChan
+from pycbsdk.cbhw.packet.factory import CBPacketFactory
+
+from lsl_comp.ez_utils.units.nsp import COUNTER_CHANNEL, COUNTER_MODULUS
+from lsl_comp.utils.loopback import HOST, MAX_DATAGRAM
+from lsl_comp.utils.pacer import Pacer
+from lsl_comp.utils.pylogger import logger_creator
+
+# stand-in for a legacy nsp on loopback, speaking cerebus protocol 4.1. it
+# answers the runlevel and config requests of pycbsdk (NSPSource connects
+# with startup_sequence=False) with a minimal config: one sample group
+# holding every channel. once configured it streams that group, one packet
+# per sample, and a protocol monitor packet every MONITOR_INTERVAL to the
+# address the requests came from. all channels are zero except
+# COUNTER_CHANNEL, which carries the sample counter modulo 2**16 as int16
+# and is unwrapped again by NSPExtractorUnit.
+PROTOCOL = "4.1"
+SYSFREQ = 30_000
+INSTRUMENT = 0
+
+# sample groups of a legacy nsp with their rates, 6 (raw) is not simulated
+GROUP_FS = {1: 500, 2: 1_000, 3: 2_000, 4: 10_000, 5: 30_000}
+N_GROUPS = 6
+
+MAX_CHANNELS = 256
+
+HEADER = struct.Struct("<QHHHBB")
+MONITOR_INTERVAL = 0.01
+# seconds of samples sent per datagram burst
+SEND_INTERVAL = 1e-3
+# seconds a receive waits while idle before the parent process is checked
+IDLE_TIMEOUT = 0.1
+
+
+def group_dtype(channels: int) -> np.dtype:
+    # header and int16 samples padded to whole 32-bit words, so consecutive
+    # packets of an array are already laid out like on the wire
+    n_values = channels + channels % 2
+    return np.dtype(
+        [
+            ("time", "<u8"),
+            ("chid", "<u2"),
+            ("type", "<u2"),
+            ("dlen", "<u2"),
+            ("instrument", "u1"),
+            ("reserved", "u1"),
+            ("data", "<i2", (n_values,)),
+        ]
+    )
+
+
+def datagrams(packets: list[bytes]) -> list[bytes]:
+    # concatenates packets into as few datagrams as fit, pycbsdk splits them
+    # again by their headers
+    out, current = [], b""
+
+    for pkt in packets:
+        if len(current) + len(pkt) > MAX_DATAGRAM:
+            out.append(current)
+            current = b""
+        current += pkt
+
+    return [*out, current] if current else out
+
+
+class NSPSimulator:
+    def __init__(self, sock: socket.socket, fs: int, channels: int) -> None:
+        self.sock = sock
+        self.fs = fs
+        self.group = next(g for g, g_fs in GROUP_FS.items() if g_fs == fs)
+        self.channels = channels
+        self.factory = CBPacketFactory(protocol=PROTOCOL)
+        self.start_time = time.monotonic()
+
+        self.client_addr: tuple[str, int] | None = None
+        self.is_streaming = False
+        self.pacer = Pacer(fs)
+        self.sample_ticks = 0
+        self.next_monitor = 0.0
+        self.n_sent = 0
+        self.n_monitor = 0
+
+        self.packets = np.zeros(
+            int(np.ceil(fs * SEND_INTERVAL)) + 1, group_dtype(channels)
+        )
+        self.packets["type"] = self.group
+        self.packets["dlen"] = self.packets.dtype["data"].shape[0] // 2
+        self.packets["instrument"] = INSTRUMENT
+
+    def now(self) -> int:
+        # proc time in sysfreq ticks since the simulator started
+        return int((time.monotonic() - self.start_time) * SYSFREQ)
+
+    def config_packet(self, pkt_type: int, **fields):
+        pkt = self.factory.make_packet(
+            None, chid=CBSpecialChan.CONFIGURATION, pkt_type=pkt_type
+        )
+        pkt.header.time = self.now()
+        pkt.header.instrument = INSTRUMENT
+        for name, value in fields.items():
+            setattr(pkt, name, value)
+        return pkt
+
+    def wire(self, pkt) -> bytes:
+        # like the firmware, fixed size bodies are truncated to whole 32-bit
+        # words, variable length ones are padded
+        array = b""
+        if isinstance(pkt, CBPacketVarLen):
+            array = bytes(pkt._array)
+            array += bytes(-(ctypes.sizeof(pkt) + len(array)) % 4)
+            pkt.header.dlen = (ctypes.sizeof(pkt) - HEADER.size + len(array)) // 4
+
+        data = ctypes.string_at(ctypes.addressof(pkt), ctypes.sizeof(pkt)) + array
+        return data[: HEADER.size + 4 * pkt.header.dlen]
+
+    def sysinfo(self, pkt_type: int) -> bytes:
+        return self.wire(
+            self.config_packet(
+                pkt_type, sysfreq=SYSFREQ, runlevel=CBRunLevel.RUNNING.value
+            )
+        )
+
+    def config_all(self) -> list[bytes]:
+        # the subset of the REQCONFIGALL cascade NSPSource relies on
+        packets = [self.wire(self.config_packet(CBPacketType.REPCONFIGALL))]
+
+        proc = self.config_packet(
+            CBPacketType.PROCREP,
+            proc=1,
+            chanbase=1,
+            chancount=self.channels,
+            groupcount=N_GROUPS,
+            version=(4 << 16) | 1,
+            _ident=b"lsl_comp nsp simulator",
+        )
+        packets.append(self.wire(proc))
+
+        for group in range(1, N_GROUPS + 1):
+            chan_list = np.arange(1, self.channels + 1) if group == self.group else []
+            info = self.config_packet(
+                CBPacketType.GROUPREP,
+                proc=1,
+                group=group,
+                period=SYSFREQ // GROUP_FS.get(group, SYSFREQ),
+                length=len(chan_list),
+            )
+            info.chan_list = chan_list
+            packets.append(self.wire(info))
+
+        for chan in range(1, self.channels + 1):
+            info = self.config_packet(
+                CBPacketType.CHANREP,
+                chan=chan,
+                proc=1,
+                chancaps=CBChanCaps.exists
+                | CBChanCaps.connected
+                | CBChanCaps.isolated
+                | CBChanCaps.ainp,
+                label=f"chan{chan}".encode(),
+                smpgroup=self.group,
+            )
+            # raw int16 values map 1:1 to microvolts
+            info.scalin.digmin, info.scalin.digmax = -32768, 32767
+            info.scalin.anamin, info.scalin.anamax = -32768, 32767
+            info.scalin.anaunit = b"uV"
+            packets.append(self.wire(info))
+
+        packets.append(self.sysinfo(CBPacketType.SYSREP))
+        return packets
+
+    def handle_requests(self, data: bytes, addr: tuple[str, int]) -> None:
+        self.client_addr = addr
+
+        while len(data) >= HEADER.size:
+            _, chid, pkt_type, dlen, _, _ = HEADER.unpack_from(data)
+            data = data[HEADER.size + 4 * dlen :]
+
+            if not chid & CBSpecialChan.CONFIGURATION:
+                continue
+
+            if pkt_type == CBPacketType.SYSSETRUNLEV:
+                self.send([self.sysinfo(CBPacketType.SYSREPRUNLEV)])
+
+            elif pkt_type == CBPacketType.REQCONFIGALL:
+                self.send(self.config_all())
+                # every (re)configuration starts a new counter
+                self.is_streaming = True
+                self.n_sent = 0
+                self.pacer = Pacer(self.fs)
+                self.pacer.start()
+                self.sample_ticks = self.now()
+                self.next_monitor = time.monotonic()
+
+            # other requests (comments, channel settings, ...) are ignored
+
+    def send(self, packets: list[bytes]) -> None:
+        for datagram in datagrams(packets):
+            self.sock.sendto(datagram, self.client_addr)
+
+    def send_samples(self, n: int) -> None:
+        if len(self.packets) < n:
+            self.packets = np.resize(self.packets, n)
+
+        packets = self.packets[:n]
+        k = self.n_sent + np.arange(n, dtype=np.int64)
+        packets["time"] = self.sample_ticks + k * (SYSFREQ // self.fs)
+        packets["data"][:, COUNTER_CHANNEL] = (
+            (k % COUNTER_MODULUS).astype(np.uint16).view(np.int16)
+        )
+
+        per_datagram = MAX_DATAGRAM // packets.itemsize
+        for start in range(0, n, per_datagram):
+            self.sock.sendto(
+                packets[start : start + per_datagram].tobytes(), self.client_addr
+            )
+
+        self.n_sent += n
+
+    def send_monitor(self) -> None:
+        self.n_monitor += 1
+        pkt = self.config_packet(
+            CBPacketType.SYSPROTOCOLMONITOR, sentpkts=1, counter=self.n_monitor
+        )
+        self.send([self.wire(pkt)])
+
+    def poll(self) -> None:
+        # drains pending requests without blocking while streaming
+        self.sock.settimeout(0.0 if self.is_streaming else IDLE_TIMEOUT)
+
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(MAX_DATAGRAM)
+            except (BlockingIOError, TimeoutError):
+                return
+            self.handle_requests(data, addr)
+            self.sock.settimeout(0.0)
+
+    def step(self) -> None:
+        self.poll()
+        if not self.is_streaming:
+            return
+
+        n = self.pacer.due()
+        if n > 0:
+            self.send_samples(n)
+
+        if time.monotonic() >= self.next_monitor:
+            self.send_monitor()
+            self.next_monitor += MONITOR_INTERVAL
+
+        self.pacer.sleep(max(1, int(self.fs * SEND_INTERVAL)))
+
+
+@click.command()
+@click.option(
+    "--fs",
+    type=click.Choice([str(fs) for fs in GROUP_FS.values()]),
+    help="Sampling rate, selects the sample group.",
+    default="30000",
+)
+@click.option(
+    "--channels",
+    type=click.IntRange(COUNTER_CHANNEL + 1, MAX_CHANNELS),
+    help=f"Channels of the sample group (counter in channel {COUNTER_CHANNEL}).",
+    default=MAX_CHANNELS,
+)
+@click.option(
+    "--addr", type=click.STRING, help="Address the nsp listens on.", default=HOST
+)
+@click.option("--port", type=click.INT, help="Port the nsp listens on.", default=51001)
+@click.option("--verbose", type=click.BOOL, help="Verbosity.", default=True)
+def main(fs: str, channels: int, addr: str, port: int, verbose: bool):
+    logger = logger_creator(verbose)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 22)
+    sock.bind((addr, port))
+    click.echo(f"Simulated nsp on {addr}:{port}, group at {fs} Hz x {channels} ch")
+
+    simulator = NSPSimulator(sock, int(fs), channels)
+
+    # stops with the process that started it, e.g. an outlet killed on timeout
+    parent_pid = os.getppid()
+
+    while os.getppid() == parent_pid:
+        was_streaming = simulator.is_streaming
+        simulator.step()
+        if simulator.is_streaming and not was_streaming:
+            logger.info(f"client {simulator.client_addr} configured, streaming")
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
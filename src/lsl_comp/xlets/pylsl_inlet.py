@@ -1,26 +1,77 @@
+import time
 from pathlib import Path
-from collections import deque
 
+import numpy as np
 import pylsl
 import click
 
+from lsl_comp.utils.barrier import open_inlet
 from lsl_comp.utils.pylogger import logger_creator
+from lsl_comp.utils.clocksync import CLOCKSYNC_MODES, ClockSync, processing_flags
+from lsl_comp.utils.logwriter import LOG_FORMATS, INLET_COLUMNS, create_log_writer
+from lsl_comp.utils.runstats import write_run_stats
+from lsl_comp.utils.window import WindowBuffer
 
 
 @click.command()
 @click.option("--fs", type=click.INT, help="Sampling rate.", required=True)
 @click.option("--mp", type=click.BOOL, help="Multiprocessing.", required=True)
 @click.option("--ws", type=click.INT, help="Window size.", required=True)
+@click.option(
+    "--chunk", type=click.INT, help="Samples per pull (1 = pull_sample).", default=1
+)
+@click.option(
+    "--channels",
+    type=click.INT,
+    help="Channels per sample (counter in channel 0).",
+    default=1,
+)
 @click.option(
     "--datatype", type=click.STRING, help="counter, airsignal.", required=True
 )
 @click.option("--platform", type=click.STRING, help="Platform (os).", required=True)
+@click.option(
+    "--log-format",
+    type=click.Choice(list(LOG_FORMATS)),
+    help="Log file format.",
+    default="csv",
+)
+@click.option(
+    "--clocksync",
+    type=click.Choice(CLOCKSYNC_MODES),
+    help="Clock offset tracking of the inlet.",
+    default="sample",
+)
+@click.option(
+    "--clocksync-interval",
+    type=click.FLOAT,
+    help="Seconds between offset refreshes with --clocksync interval.",
+    default=1.0,
+)
+@click.option(
+    "--stream-name",
+    type=click.STRING,
+    help="LSL stream name and source id (default: datatype).",
+    default=None,
+)
 @click.option("--verbose", type=click.BOOL, help="Verbosity.", default=True)
 @click.option(
     "--id", type=click.INT, help="Run ID to pair inlet and outlet.", required=True
 )
 def main(
-    fs: int, mp: bool, ws: int, datatype: str, platform: str, verbose: bool, id: int
+    fs: int,
+    mp: bool,
+    ws: int,
+    chunk: int,
+    channels: int,
+    datatype: str,
+    platform: str,
+    log_format: str,
+    clocksync: str,
+    clocksync_interval: float,
+    stream_name: str | None,
+    verbose: bool,
+    id: int,
 ):
     if datatype not in ["counter", "airsignal"]:
         raise ValueError("Incompatible datatype.")
@@ -28,77 +79,132 @@ def main(
     logger = logger_creator(verbose)
 
     file_name = Path(
-        f"./logs/id-{id}_inlet-pylsl_datatype-{datatype}_platform-{platform}_multiproc-{str(mp)}_fs-{fs}_window-{ws}.csv"
+        f"./logs/id-{id}_inlet-pylsl_datatype-{datatype}_platform-{platform}_multiproc-{str(mp)}_fs-{fs}_window-{ws}_chunk-{chunk}_channels-{channels}_clocksync-{clocksync}{LOG_FORMATS[log_format]}"
     )
     click.echo(f"Logs: {file_name}")
 
     # init lsl stream
-    streams = pylsl.resolve_byprop("name", datatype)
-    inlet = pylsl.StreamInlet(streams[0], max_buflen=1)
+    inlet, connection_setup_time = open_inlet(
+        stream_name or datatype, processing_flags=processing_flags(clocksync)
+    )
+    clock_sync = ClockSync(inlet, clocksync, interval=clocksync_interval)
 
     # set window size
     window_size = ws
 
     # init buffer for windowing
-    if window_size != 1:
-        buffer = deque(maxlen=window_size)
+    buffer = WindowBuffer(window_size)
+
+    # preallocated destination for chunked pulls (stream format is float32)
+    if chunk > 1:
+        chunk_buffer = np.zeros((chunk, inlet.info().channel_count()), dtype=np.float32)
+        chunk_block = np.empty((chunk, 4))
 
     # create log files
-    file = open(file_name, "w")
-    file.write(
-        ",".join(
-            [
-                "t_gen_outlet",
-                "t_lsl_offset",
-                "t_arr_inlet",
-                "x\n",
-            ]
-        )
+    writer = create_log_writer(
+        log_format, file_name, INLET_COLUMNS, window_size=window_size, logger=logger
     )
-
-    while True:
-        sample, t_gen_outlet = inlet.pull_sample()
-
-        if sample and t_gen_outlet:
-            sample = int(sample[0])
-
-            # -1 sent after the last sample to gracefully close stream
-            if sample == -1:
-                break
-
-            t_offset, t_arrival = inlet.time_correction(), pylsl.local_clock()
-
-            if window_size == 1:
-                logger.debug(("[pylsl-inlet] ", t_gen_outlet, sample))
-                file.write(f"{t_gen_outlet},{t_offset},{t_arrival},{sample}\n")
-            else:
-                buffer.append((t_gen_outlet, t_offset, t_arrival, sample))
-                if len(buffer) == window_size:
-                    log_line = [
-                        ";".join((str(e) for e in b)) for b in list(zip(*buffer))
-                    ]
-                    log_line = ",".join(log_line) + "\n"
-
-                    file.write(log_line)
-
-                    logger.debug(("[pylsl-inlet] ", t_gen_outlet, len(buffer)))
-
-                    buffer.clear()
+    window_id = 0
+
+    def log_sample(
+        t_gen_outlet: float, t_offset: float, t_arrival: float, sample: int
+    ) -> None:
+        nonlocal window_id
+
+        if window_size == 1:
+            logger.debug(("[pylsl-inlet] ", t_gen_outlet, sample))
+            writer.write_row(window_id, t_gen_outlet, t_offset, t_arrival, sample)
+            window_id += 1
+        else:
+            buffer.append(t_gen_outlet, t_offset, t_arrival, sample)
+            if buffer.is_full():
+                writer.write_rows(buffer.flush())
+
+                logger.debug(("[pylsl-inlet] ", t_gen_outlet, window_size))
+
+    def log_block(block: np.ndarray) -> None:
+        nonlocal window_id
+
+        if window_size == 1:
+            rows = np.empty((len(block), len(INLET_COLUMNS)))
+            rows[:, 0] = np.arange(window_id, window_id + len(block))
+            rows[:, 1:] = block
+            writer.write_rows(rows)
+            window_id += len(block)
+        else:
+            for rows in buffer.extend(block):
+                writer.write_rows(rows)
+
+    start_cpu_time = time.process_time()
+    n = 0
+    is_done = False
+
+    while not is_done:
+        if chunk == 1:
+            sample, t_gen_outlet = inlet.pull_sample()
+
+            if sample and t_gen_outlet:
+                sample = int(sample[0])
+
+                # -1 sent after the last sample to gracefully close stream
+                if sample == -1:
+                    break
+
+                t_arrival = pylsl.local_clock()
+                t_offset = clock_sync.offset(t_arrival)
+                log_sample(t_gen_outlet, t_offset, t_arrival, sample)
+                n += 1
+        else:
+            _, timestamps = inlet.pull_chunk(
+                timeout=1.0, max_samples=chunk, dest_obj=chunk_buffer
+            )
+
+            if len(timestamps) > 0:
+                t_arrival = pylsl.local_clock()
+                t_offset = clock_sync.offset(t_arrival)
+
+                n_pulled = len(timestamps)
+                counter = chunk_buffer[:n_pulled, 0]
+
+                # -1 sent after the last sample to gracefully close stream
+                end = np.flatnonzero(counter == -1)
+                if len(end) > 0:
+                    n_pulled = int(end[0])
+                    is_done = True
+
+                block = chunk_block[:n_pulled]
+                block[:, 0] = timestamps[:n_pulled]
+                block[:, 1] = t_offset
+                block[:, 2] = t_arrival
+                block[:, 3] = counter[:n_pulled]
+
+                log_block(block)
+                n += n_pulled
 
     # write last remaining buffer to disk
     # if last buffer is less than the window_size, then it is never written to disk
     if window_size > 1 and len(buffer) > 0:
         logger.debug("log the last remaining buffer...")
-        log_line = [";".join((str(e) for e in b)) for b in list(zip(*buffer))]
-        log_line = ",".join(log_line) + "\n"
-
-        logger.debug(("[pylsl-inlet]", t_gen_outlet, len(buffer)))
-        file.write(log_line)
+        logger.debug(("[pylsl-inlet]", len(buffer)))
+        writer.write_rows(buffer.flush())
+
+    cpu_time = time.process_time() - start_cpu_time
+    n_log_overflow = writer.close()
+    write_run_stats(
+        file_name,
+        {
+            "n_samples": n,
+            "cpu_time": cpu_time,
+            "cpu_time_per_sample": cpu_time / max(n, 1),
+            "n_log_overflow": n_log_overflow,
+            "connection_setup_time": connection_setup_time,
+            **clock_sync.summary(),
+        },
+    )
+    click.echo(f"CPU time per sample: {1e6 * cpu_time / max(n, 1):.3f} us")
 
     logger.info("closing inlet and writing logs to disk...")
     inlet.close_stream()
-    file.flush()
-    file.close()
 
 
 if __name__ == "__main__":
@@ -1,10 +1,16 @@
 import time
 from pathlib import Path
 
+import numpy as np
 import pylsl
 import click
 
+from lsl_comp.utils.pacer import Pacer
+from lsl_comp.utils.barrier import wait_for_consumer
 from lsl_comp.utils.pylogger import logger_creator
+from lsl_comp.utils.clocksync import CLOCKSYNC_MODES
+from lsl_comp.utils.logwriter import LOG_FORMATS, OUTLET_COLUMNS, create_log_writer
+from lsl_comp.utils.runstats import write_run_stats
 
 
 @click.command()
@@ -12,10 +18,43 @@ from lsl_comp.utils.pylogger import logger_creator
 @click.option("--fs", type=click.INT, help="Sampling rate.", required=True)
 @click.option("--mp", type=click.BOOL, help="Multiprocessing.", required=True)
 @click.option("--ws", type=click.INT, help="Inlet window size.", required=True)
+@click.option(
+    "--chunk", type=click.INT, help="Samples per push (1 = push_sample).", default=1
+)
+@click.option(
+    "--spin",
+    type=click.FLOAT,
+    help="Seconds busy-waited before each pacing deadline.",
+    default=0.0,
+)
+@click.option(
+    "--channels",
+    type=click.INT,
+    help="Channels per sample (counter in channel 0).",
+    default=1,
+)
 @click.option(
     "--datatype", type=click.STRING, help="counter, airsignal.", required=True
 )
 @click.option("--platform", type=click.STRING, help="Platform (os).", required=True)
+@click.option(
+    "--log-format",
+    type=click.Choice(list(LOG_FORMATS)),
+    help="Log file format.",
+    default="csv",
+)
+@click.option(
+    "--clocksync",
+    type=click.Choice(CLOCKSYNC_MODES),
+    help="Clock offset tracking of the inlet.",
+    default="sample",
+)
+@click.option(
+    "--stream-name",
+    type=click.STRING,
+    help="LSL stream name and source id (default: datatype).",
+    default=None,
+)
 @click.option("--verbose", type=click.BOOL, help="Verbosity.", default=True)
 @click.option(
     "--id", type=click.INT, help="Run ID to pair inlet and outlet.", required=True
@@ -25,8 +64,14 @@ def main(
     fs: int,
     mp: bool,
     ws: int,
+    chunk: int,
+    channels: int,
+    spin: float,
     datatype: str,
     platform: str,
+    log_format: str,
+    clocksync: str,
+    stream_name: str | None,
     verbose: bool,
     id: int,
 ):
@@ -36,54 +81,95 @@ def main(
     logger = logger_creator(verbose)
 
     file_name = Path(
-        f"./logs/id-{id}_outlet-pylsl_datatype-{datatype}_platform-{platform}_multiproc-{str(mp)}_fs-{fs}_window-{ws}.csv"
+        f"./logs/id-{id}_outlet-pylsl_datatype-{datatype}_platform-{platform}_multiproc-{str(mp)}_fs-{fs}_window-{ws}_chunk-{chunk}_channels-{channels}_clocksync-{clocksync}{LOG_FORMATS[log_format]}"
     )
     click.echo(f"Logs: {file_name}")
 
     # create log files
-    file = open(file_name, "w")
-    file.write(
-        ",".join(
-            [
-                "t_gen_outlet",
-                "x\n",
-            ]
-        )
-    )
+    writer = create_log_writer(log_format, file_name, OUTLET_COLUMNS, logger=logger)
 
     # create lsl stream
+    stream_name = stream_name or datatype
     info = pylsl.StreamInfo(
-        name=datatype, type=datatype, channel_count=1, nominal_srate=fs
+        name=stream_name,
+        type=datatype,
+        channel_count=channels,
+        nominal_srate=fs,
+        source_id=stream_name,
     )
     outlet = pylsl.StreamOutlet(info=info, chunk_size=0, max_buffered=360)
 
-    start_time = pylsl.local_clock()
-    sent_samples = 0
+    # preallocated payload, channels other than the counter stay zero
+    mysample = [0.0] * channels
+
+    # preallocated block for chunked pushes, filled one sample at a time
+    if chunk > 1:
+        block = np.zeros((chunk, channels), dtype=np.float32)
+        block_timestamps = np.zeros(chunk, dtype=np.float64)
+        block_idx = 0
+
+    # pacing starts once the inlet has subscribed
+    connection_setup_time = wait_for_consumer(outlet)
+    if connection_setup_time is None:
+        logger.warning("no consumer connected, starting without inlet")
+
+    pacer = Pacer(fs, spin=spin)
+    pacer.start()
+    start_cpu_time = time.process_time()
     total_count = tc
     n = 0
 
     while n < total_count:
-        elapsed_time = pylsl.local_clock() - start_time
-        required_samples = int(fs * elapsed_time) - sent_samples
+        required_samples = min(pacer.due(), total_count - n)
 
         for _ in range(required_samples):
-            mysample = [n]
             curr_time = pylsl.local_clock()
-            outlet.push_sample(mysample, curr_time)
 
-            file.write(f"{curr_time},{n}\n")
+            if chunk == 1:
+                mysample[0] = n
+                outlet.push_sample(mysample, curr_time)
+            else:
+                block[block_idx, 0] = n
+                block_timestamps[block_idx] = curr_time
+                block_idx += 1
+
+                if block_idx == chunk:
+                    outlet.push_chunk(block, block_timestamps.tolist())
+                    block_idx = 0
+
+            writer.write_row(curr_time, n)
             logger.debug(
-                ("[pylsl-outlet] ", curr_time - start_time, curr_time, mysample)
+                ("[pylsl-outlet] ", curr_time - pacer.start_time, curr_time, n)
             )
             n += 1
 
-        sent_samples += required_samples
-        time.sleep(1 / fs)
+        pacer.sleep()
 
     logger.info("closing outlet and writing logs to disk...")
-    outlet.push_sample([-1], pylsl.local_clock())
-    file.flush()
-    file.close()
+    if chunk == 1:
+        mysample[0] = -1
+        outlet.push_sample(mysample, pylsl.local_clock())
+    else:
+        # pad the last block with -1 so the inlet receives a full chunk
+        # and does not have to wait for its pull timeout
+        block[block_idx:, 0] = -1
+        block_timestamps[block_idx:] = pylsl.local_clock()
+        outlet.push_chunk(block, block_timestamps.tolist())
+
+    cpu_time = time.process_time() - start_cpu_time
+    n_log_overflow = writer.close()
+    write_run_stats(
+        file_name,
+        {
+            "n_samples": n,
+            "cpu_time": cpu_time,
+            "cpu_time_per_sample": cpu_time / max(n, 1),
+            "n_log_overflow": n_log_overflow,
+            "connection_setup_time": connection_setup_time,
+            "pacing": pacer.summary(),
+        },
+    )
+    click.echo(f"CPU time per sample: {1e6 * cpu_time / max(n, 1):.3f} us")
 
 
 if __name__ == "__main__":
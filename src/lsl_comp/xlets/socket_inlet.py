@@ -0,0 +1,194 @@
+import time
+from pathlib import Path
+
+import numpy as np
+import pylsl
+import click
+
+from lsl_comp.utils.pylogger import logger_creator
+from lsl_comp.utils.clocksync import CLOCKSYNC_MODES
+from lsl_comp.utils.logwriter import LOG_FORMATS, INLET_COLUMNS, create_log_writer
+from lsl_comp.utils.runstats import write_run_stats
+from lsl_comp.utils.loopback import PROTOCOLS, RecordReader, listen, record_dtype
+from lsl_comp.utils.window import WindowBuffer
+
+# seconds without datagrams after which a udp stream is considered closed
+END_TIMEOUT = 10.0
+
+
+@click.command()
+@click.option("--fs", type=click.INT, help="Sampling rate.", required=True)
+@click.option("--mp", type=click.BOOL, help="Multiprocessing.", required=True)
+@click.option("--ws", type=click.INT, help="Window size.", required=True)
+@click.option("--chunk", type=click.INT, help="Samples per read.", default=1)
+@click.option(
+    "--channels",
+    type=click.INT,
+    help="Channels per sample (counter in channel 0).",
+    default=1,
+)
+@click.option(
+    "--datatype", type=click.STRING, help="counter, airsignal.", required=True
+)
+@click.option("--platform", type=click.STRING, help="Platform (os).", required=True)
+@click.option(
+    "--log-format",
+    type=click.Choice(list(LOG_FORMATS)),
+    help="Log file format.",
+    default="csv",
+)
+@click.option(
+    "--clocksync",
+    type=click.Choice(CLOCKSYNC_MODES),
+    help="Clock offset tracking of the inlet.",
+    default="sample",
+)
+@click.option(
+    "--clocksync-interval",
+    type=click.FLOAT,
+    help="Seconds between offset refreshes with --clocksync interval.",
+    default=1.0,
+)
+@click.option(
+    "--stream-name",
+    type=click.STRING,
+    help="Stream name (unused, the port identifies the run).",
+    default=None,
+)
+@click.option(
+    "--protocol",
+    type=click.Choice(PROTOCOLS),
+    help="Loopback transport.",
+    default="udp",
+)
+@click.option("--port", type=click.INT, help="Port to listen on.", required=True)
+@click.option("--verbose", type=click.BOOL, help="Verbosity.", default=True)
+@click.option(
+    "--id", type=click.INT, help="Run ID to pair inlet and outlet.", required=True
+)
+def main(
+    fs: int,
+    mp: bool,
+    ws: int,
+    chunk: int,
+    channels: int,
+    datatype: str,
+    platform: str,
+    log_format: str,
+    clocksync: str,
+    clocksync_interval: float,
+    stream_name: str | None,
+    protocol: str,
+    port: int,
+    verbose: bool,
+    id: int,
+):
+    if datatype not in ["counter", "airsignal"]:
+        raise ValueError("Incompatible datatype.")
+
+    logger = logger_creator(verbose)
+
+    file_name = Path(
+        f"./logs/id-{id}_inlet-socket{protocol}_datatype-{datatype}_platform-{platform}_multiproc-{str(mp)}_fs-{fs}_window-{ws}_chunk-{chunk}_channels-{channels}_clocksync-{clocksync}{LOG_FORMATS[log_format]}"
+    )
+    click.echo(f"Logs: {file_name}")
+
+    # wait for the outlet to connect
+    start_time = pylsl.local_clock()
+    sock = listen(protocol, port)
+    connection_setup_time = pylsl.local_clock() - start_time
+
+    # udp has no end of stream, a lost -1 datagram must not hang the inlet
+    if protocol == "udp":
+        sock.settimeout(END_TIMEOUT)
+
+    reader = RecordReader(sock, protocol, record_dtype(channels), max_records=chunk)
+
+    # set window size
+    window_size = ws
+
+    # init buffer for windowing
+    buffer = WindowBuffer(window_size)
+    chunk_block = np.empty((chunk, 4))
+
+    # create log files
+    writer = create_log_writer(
+        log_format, file_name, INLET_COLUMNS, window_size=window_size, logger=logger
+    )
+    window_id = 0
+
+    def log_block(block: np.ndarray) -> None:
+        nonlocal window_id
+
+        if window_size == 1:
+            rows = np.empty((len(block), len(INLET_COLUMNS)))
+            rows[:, 0] = np.arange(window_id, window_id + len(block))
+            rows[:, 1:] = block
+            writer.write_rows(rows)
+            window_id += len(block)
+        else:
+            for rows in buffer.extend(block):
+                writer.write_rows(rows)
+
+    start_cpu_time = time.process_time()
+    n = 0
+    is_done = False
+
+    while not is_done:
+        records = reader.read()
+
+        if len(records) == 0:
+            logger.warning("connection closed before the end of the stream")
+            break
+
+        t_arrival = pylsl.local_clock()
+
+        n_read = len(records)
+        counter = records["data"][:, 0]
+
+        # -1 sent after the last sample to gracefully close stream
+        end = np.flatnonzero(counter == -1)
+        if len(end) > 0:
+            n_read = int(end[0])
+            is_done = True
+
+        # outlet and inlet share the local clock, the offset is always zero
+        block = chunk_block[:n_read]
+        block[:, 0] = records["timestamp"][:n_read]
+        block[:, 1] = 0.0
+        block[:, 2] = t_arrival
+        block[:, 3] = counter[:n_read]
+
+        log_block(block)
+        n += n_read
+
+    # write last remaining buffer to disk
+    # if last buffer is less than the window_size, then it is never written to disk
+    if window_size > 1 and len(buffer) > 0:
+        logger.debug("log the last remaining buffer...")
+        logger.debug(("[socket-inlet]", len(buffer)))
+        writer.write_rows(buffer.flush())
+
+    cpu_time = time.process_time() - start_cpu_time
+    n_log_overflow = writer.close()
+    write_run_stats(
+        file_name,
+        {
+            "n_samples": n,
+            "cpu_time": cpu_time,
+            "cpu_time_per_sample": cpu_time / max(n, 1),
+            "n_log_overflow": n_log_overflow,
+            "connection_setup_time": connection_setup_time,
+            "clocksync": clocksync,
+            "clocksync_interval": clocksync_interval,
+            "offset_updates": [],
+        },
+    )
+    click.echo(f"CPU time per sample: {1e6 * cpu_time / max(n, 1):.3f} us")
+
+    logger.info("closing inlet and writing logs to disk...")
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import time
+from pathlib import Path
+
+import numpy as np
+import pylsl
+import click
+
+from lsl_comp.utils.pacer import Pacer
+from lsl_comp.utils.barrier import CONSUMER_TIMEOUT
+from lsl_comp.utils.pylogger import logger_creator
+from lsl_comp.utils.clocksync import CLOCKSYNC_MODES
+from lsl_comp.utils.logwriter import LOG_FORMATS, OUTLET_COLUMNS, create_log_writer
+from lsl_comp.utils.runstats import write_run_stats
+from lsl_comp.utils.loopback import PROTOCOLS, connect, record_dtype, send_records
+
+
+@click.command()
+@click.option("--tc", type=click.INT, help="Total count.", required=True)
+@click.option("--fs", type=click.INT, help="Sampling rate.", required=True)
+@click.option("--mp", type=click.BOOL, help="Multiprocessing.", required=True)
+@click.option("--ws", type=click.INT, help="Inlet window size.", required=True)
+@click.option(
+    "--chunk", type=click.INT, help="Samples per push (1 = push_sample).", default=1
+)
+@click.option(
+    "--spin",
+    type=click.FLOAT,
+    help="Seconds busy-waited before each pacing deadline.",
+    default=0.0,
+)
+@click.option(
+    "--channels",
+    type=click.INT,
+    help="Channels per sample (counter in channel 0).",
+    default=1,
+)
+@click.option(
+    "--datatype", type=click.STRING, help="counter, airsignal.", required=True
+)
+@click.option("--platform", type=click.STRING, help="Platform (os).", required=True)
+@click.option(
+    "--log-format",
+    type=click.Choice(list(LOG_FORMATS)),
+    help="Log file format.",
+    default="csv",
+)
+@click.option(
+    "--clocksync",
+    type=click.Choice(CLOCKSYNC_MODES),
+    help="Clock offset tracking of the inlet.",
+    default="sample",
+)
+@click.option(
+    "--stream-name",
+    type=click.STRING,
+    help="Stream name (unused, the port identifies the run).",
+    default=None,
+)
+@click.option(
+    "--protocol",
+    type=click.Choice(PROTOCOLS),
+    help="Loopback transport.",
+    default="udp",
+)
+@click.option(
+    "--port", type=click.INT, help="Port the inlet listens on.", required=True
+)
+@click.option("--verbose", type=click.BOOL, help="Verbosity.", default=True)
+@click.option(
+    "--id", type=click.INT, help="Run ID to pair inlet and outlet.", required=True
+)
+def main(
+    tc: int,
+    fs: int,
+    mp: bool,
+    ws: int,
+    chunk: int,
+    channels: int,
+    spin: float,
+    datatype: str,
+    platform: str,
+    log_format: str,
+    clocksync: str,
+    stream_name: str | None,
+    protocol: str,
+    port: int,
+    verbose: bool,
+    id: int,
+):
+    if datatype != "counter":
+        raise ValueError("Incompatible datatype.")
+
+    logger = logger_creator(verbose)
+
+    file_name = Path(
+        f"./logs/id-{id}_outlet-socket{protocol}_datatype-{datatype}_platform-{platform}_multiproc-{str(mp)}_fs-{fs}_window-{ws}_chunk-{chunk}_channels-{channels}_clocksync-{clocksync}{LOG_FORMATS[log_format]}"
+    )
+    click.echo(f"Logs: {file_name}")
+
+    # create log files
+    writer = create_log_writer(log_format, file_name, OUTLET_COLUMNS, logger=logger)
+
+    # preallocated records, channels other than the counter stay zero
+    block = np.zeros(chunk, dtype=record_dtype(channels))
+    block_idx = 0
+
+    # pacing starts once the inlet has answered
+    sock, connection_setup_time = connect(protocol, port, CONSUMER_TIMEOUT)
+    if connection_setup_time is None:
+        logger.warning("no consumer connected, starting without inlet")
+
+    pacer = Pacer(fs, spin=spin)
+    pacer.start()
+    start_cpu_time = time.process_time()
+    total_count = tc
+    n = 0
+
+    while n < total_count:
+        required_samples = min(pacer.due(), total_count - n)
+
+        for _ in range(required_samples):
+            curr_time = pylsl.local_clock()
+
+            block["timestamp"][block_idx] = curr_time
+            block["data"][block_idx, 0] = n
+            block_idx += 1
+
+            if block_idx == chunk:
+                send_records(sock, protocol, block)
+                block_idx = 0
+
+            writer.write_row(curr_time, n)
+            logger.debug(
+                ("[socket-outlet] ", curr_time - pacer.start_time, curr_time, n)
+            )
+            n += 1
+
+        pacer.sleep()
+
+    logger.info("closing outlet and writing logs to disk...")
+    # pad the last block with -1 so the inlet receives a full chunk
+    block["timestamp"][block_idx:] = pylsl.local_clock()
+    block["data"][block_idx:, 0] = -1
+    send_records(sock, protocol, block)
+    sock.close()
+
+    cpu_time = time.process_time() - start_cpu_time
+    n_log_overflow = writer.close()
+    write_run_stats(
+        file_name,
+        {
+            "n_samples": n,
+            "cpu_time": cpu_time,
+            "cpu_time_per_sample": cpu_time / max(n, 1),
+            "n_log_overflow": n_log_overflow,
+            "connection_setup_time": connection_setup_time,
+            "pacing": pacer.summary(),
+        },
+    )
+    click.echo(f"CPU time per sample: {1e6 * cpu_time / max(n, 1):.3f} us")
+
+
+if __name__ == "__main__":
+    main()